@@ -0,0 +1,171 @@
+"""
+Reviewer throughput of the sync (threadpool) and async (asyncpg) database paths.
+
+Seeds one project and a set of reviewers, then runs N concurrent simulated
+reviewers for a fixed time. Each reviewer loop is one request's worth of work
+on the hot path: lease a task, read the progress counters, release the lease.
+
+  sync  - each request runs on a worker thread with a psycopg2 session, the way
+          FastAPI runs `def` endpoints (--threads workers, 40 by default)
+  async - each request runs on the event loop with an asyncpg session, the way
+          the `async def` endpoints do
+
+Both use the pool settings from the environment (DB_POOL_SIZE, DB_MAX_OVERFLOW, ...).
+
+    python -m benchmarks.bench_async_pool --reviewers 50 200 1000 --duration 20
+"""
+import argparse
+import asyncio
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import select, text
+
+from benchmarks.common import summarize, write_results
+from database import SessionLocal, AsyncSessionLocal, async_engine
+import models
+import run_init_db
+import task_assignment
+
+
+def seed(db, cells: int, reviewers: int):
+    project = models.Project(name="bench-async-pool", description="benchmark")
+    db.add(project)
+    db.flush()
+
+    side = math.ceil(math.sqrt(cells))
+    db.execute(text("""
+        INSERT INTO subdivisions (project_id, geom, completion_count)
+        SELECT :pid,
+               ST_MakeEnvelope((g % :side) * 0.001, (g / :side) * 0.001,
+                               (g % :side + 1) * 0.001, (g / :side + 1) * 0.001, 4326),
+               0
+        FROM generate_series(0, :cells - 1) AS g
+    """), {"pid": project.id, "side": side, "cells": cells})
+    prefix = f"bench-async-pool-{time.time_ns()}-"
+    user_ids = db.execute(text("""
+        INSERT INTO users (username, hashed_password, is_admin)
+        SELECT :prefix || g, 'x', false FROM generate_series(1, :n) AS g
+        RETURNING id
+    """), {"prefix": prefix, "n": reviewers}).scalars().all()
+    db.execute(text("""
+        INSERT INTO project_stats (project_id, completion_threshold, total_subtasks, completed_subtasks,
+                                   zero_completed_subtasks, completion_sum, version)
+        VALUES (:pid, 10, :cells, 0, :cells, 0, 0)
+    """), {"pid": project.id, "cells": cells})
+    db.commit()
+    db.execute(text("ANALYZE subdivisions"))
+    return project.id, user_ids
+
+
+def _progress_query(project_id: int):
+    return select(models.ProjectStats).where(models.ProjectStats.project_id == project_id)
+
+
+def sync_request(project_id: int, user_id: int):
+    db = SessionLocal()
+    try:
+        task_assignment.lease_tasks(db, project_id, user_id, 1)
+        db.commit()
+        db.execute(_progress_query(project_id)).first()
+        task_assignment.release_lease(db, project_id, user_id)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def async_request(project_id: int, user_id: int):
+    async with AsyncSessionLocal() as db:
+        await db.run_sync(task_assignment.lease_tasks, project_id, user_id, 1)
+        await db.commit()
+        (await db.execute(_progress_query(project_id))).first()
+        await db.run_sync(task_assignment.release_lease, project_id, user_id)
+        await db.commit()
+
+
+async def run(mode: str, project_id: int, user_ids, duration: float, threads: int):
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=threads) if mode == "sync" else None
+    deadline = time.perf_counter() + duration
+    samples = []
+    errors = 0
+
+    async def reviewer(user_id):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                if executor is not None:
+                    await loop.run_in_executor(executor, sync_request, project_id, user_id)
+                else:
+                    await async_request(project_id, user_id)
+            except Exception:
+                errors += 1
+                continue
+            samples.append((time.perf_counter() - start) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(reviewer(user_id) for user_id in user_ids))
+    elapsed = time.perf_counter() - started
+    if executor is not None:
+        executor.shutdown()
+
+    return {
+        **summarize(samples),
+        "errors": errors,
+        "requests_per_s": round(len(samples) / elapsed, 1),
+    }
+
+
+def cleanup(db, project_id: int, user_ids):
+    db.execute(text("DELETE FROM task_leases WHERE project_id = :pid"), {"pid": project_id})
+    db.execute(text("DELETE FROM project_stats WHERE project_id = :pid"), {"pid": project_id})
+    db.execute(text("DELETE FROM subdivisions WHERE project_id = :pid"), {"pid": project_id})
+    db.execute(text("DELETE FROM projects WHERE id = :pid"), {"pid": project_id})
+    db.execute(text("DELETE FROM users WHERE id = ANY(:ids)"), {"ids": list(user_ids)})
+    db.commit()
+
+
+async def bench(args, project_id: int, user_ids):
+    results = []
+    for reviewers in args.reviewers:
+        row = {"reviewers": reviewers}
+        for mode in ("sync", "async"):
+            row[mode] = await run(mode, project_id, user_ids[:reviewers], args.duration, args.threads)
+        results.append(row)
+        print(
+            f"{reviewers:>5} reviewers"
+            f" | sync {row['sync']['requests_per_s']:>8} req/s p99 {row['sync'].get('p99_ms')} ms"
+            f" | async {row['async']['requests_per_s']:>8} req/s p99 {row['async'].get('p99_ms')} ms"
+        )
+    await async_engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviewers", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per mode and concurrency level")
+    parser.add_argument("--threads", type=int, default=40, help="Worker threads for the sync mode")
+    parser.add_argument("--cells", type=int, default=100_000)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    run_init_db.upgrade()
+
+    db = SessionLocal()
+    project_id, user_ids = seed(db, args.cells, max(args.reviewers))
+    try:
+        results = asyncio.run(bench(args, project_id, user_ids))
+    finally:
+        db.rollback()
+        cleanup(db, project_id, user_ids)
+        db.close()
+
+    if args.output:
+        write_results(args.output, "bench_async_pool", args, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Latency of /tasks/next task assignment at different grid sizes.
+
+Seeds one synthetic project per grid size, marks a share of the cells as
+already annotated by the benchmark user, then times task_assignment.pick_next_task
+against the previous ORDER BY random() query.
+
+    python -m benchmarks.bench_next_task --sizes 10000 100000 1000000
+"""
+import argparse
+import math
+import time
+
+from sqlalchemy import func, text
+
+from benchmarks.common import time_repeated, write_results
+from database import SessionLocal
+import models
+import run_init_db
+import task_assignment
+
+
+def seed_project(db, size: int, done_share: float):
+    user = models.User(username=f"bench-next-task-{time.time_ns()}", hashed_password="x")
+    project = models.Project(name=f"bench-next-task-{size}", description="benchmark")
+    db.add_all([user, project])
+    db.flush()
+
+    side = math.ceil(math.sqrt(size))
+    db.execute(text("""
+        INSERT INTO subdivisions (project_id, geom, completion_count)
+        SELECT :pid,
+               ST_MakeEnvelope((g % :side) * 0.001, (g / :side) * 0.001,
+                               (g % :side + 1) * 0.001, (g / :side + 1) * 0.001, 4326),
+               floor(random() * 4)::int
+        FROM generate_series(0, :size - 1) AS g
+    """), {"pid": project.id, "side": side, "size": size})
+    db.execute(text("""
+        INSERT INTO annotations (project_id, user_id, subdivision_id, label_type, geom)
+        SELECT project_id, :uid, id, 'circle:0', ST_Centroid(geom)
+        FROM subdivisions
+        WHERE project_id = :pid AND random() < :share
+    """), {"pid": project.id, "uid": user.id, "share": done_share})
+    db.execute(text("""
+        INSERT INTO task_submissions (project_id, subdivision_id, user_id)
+        SELECT project_id, subdivision_id, user_id FROM annotations
+        WHERE project_id = :pid AND user_id = :uid
+    """), {"pid": project.id, "uid": user.id})
+    db.commit()
+    db.execute(text("ANALYZE subdivisions"))
+    db.execute(text("ANALYZE annotations"))
+    db.execute(text("ANALYZE task_submissions"))
+    return project.id, user.id
+
+
+def legacy_pick(db, project_id: int, user_id: int):
+    completed_subq = db.query(models.Annotation.subdivision_id).filter(
+        models.Annotation.project_id == project_id,
+        models.Annotation.user_id == user_id
+    ).subquery()
+    return db.query(models.Subdivision).filter(
+        models.Subdivision.project_id == project_id,
+        ~models.Subdivision.id.in_(completed_subq)
+    ).order_by(func.random()).first()
+
+
+def cleanup(db, project_id: int, user_id: int):
+    db.execute(text("DELETE FROM annotations WHERE project_id = :pid"), {"pid": project_id})
+    db.execute(text("DELETE FROM task_submissions WHERE project_id = :pid"), {"pid": project_id})
+    db.execute(text("DELETE FROM subdivisions WHERE project_id = :pid"), {"pid": project_id})
+    db.execute(text("DELETE FROM projects WHERE id = :pid"), {"pid": project_id})
+    db.execute(text("DELETE FROM users WHERE id = :uid"), {"uid": user_id})
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--legacy-iterations", type=int, default=20)
+    parser.add_argument("--done-share", type=float, default=0.05)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    run_init_db.upgrade()
+
+    results = []
+    for size in args.sizes:
+        db = SessionLocal()
+        project_id, user_id = seed_project(db, size, args.done_share)
+        try:
+            row = {
+                "subdivisions": size,
+                "engine": time_repeated(
+                    lambda: task_assignment.pick_next_task(db, project_id, user_id), args.iterations
+                ),
+                "order_by_random": time_repeated(
+                    lambda: legacy_pick(db, project_id, user_id), args.legacy_iterations
+                ),
+            }
+            results.append(row)
+            print(
+                f"{size:>9} cells | engine p50 {row['engine']['p50_ms']:>8} ms"
+                f" p99 {row['engine']['p99_ms']:>8} ms"
+                f" | order_by_random p50 {row['order_by_random']['p50_ms']:>8} ms"
+                f" p99 {row['order_by_random']['p99_ms']:>8} ms"
+            )
+        finally:
+            db.rollback()
+            cleanup(db, project_id, user_id)
+            db.close()
+
+    if args.output:
+        write_results(args.output, "bench_next_task", args, results)
+
+
+if __name__ == "__main__":
+    main()
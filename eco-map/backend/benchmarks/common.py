@@ -0,0 +1,66 @@
+"""
+Shared helpers for the benchmark scripts: latency summaries and result files.
+
+Result files are JSON with the run metadata next to the numbers, so two runs
+can be compared with `python -m benchmarks.compare old.json new.json`.
+"""
+import json
+import platform
+import statistics
+import subprocess
+import time
+
+
+def percentile(ordered, share: float):
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+def summarize(samples_ms):
+    """Latency summary of millisecond samples."""
+    if not samples_ms:
+        return {"count": 0}
+    ordered = sorted(samples_ms)
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": round(percentile(ordered, 0.50), 3),
+        "p95_ms": round(percentile(ordered, 0.95), 3),
+        "p99_ms": round(percentile(ordered, 0.99), 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+def time_repeated(fn, repeat: int, warmup: int = 1):
+    """Call fn repeat times after warmup calls; returns the summary of the timed calls."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path: str, benchmark: str, args, results):
+    document = {
+        "benchmark": benchmark,
+        "revision": _git_revision(),
+        "finished_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "args": vars(args),
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+    print(f"Results written to {path}")
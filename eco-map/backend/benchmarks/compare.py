@@ -0,0 +1,72 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+Every latency (keys ending in _ms, except max_ms) and rate (keys ending in _per_s) present
+in both files is compared. Latencies regress when they grow and rates regress
+when they shrink, in both cases by more than --threshold percent. Exits with
+status 1 if anything regressed, so the check can gate CI or a release.
+
+    python -m benchmarks.compare baseline.json current.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+
+def _leaves(value, path=()):
+    if isinstance(value, dict):
+        for key, child in value.items():
+            yield from _leaves(child, path + (str(key),))
+    elif isinstance(value, list):
+        for index, child in enumerate(value):
+            # Rows of a sweep are named by their first field, e.g. reviewers=50
+            label = next(iter(child.items())) if isinstance(child, dict) and child else (index, "")
+            yield from _leaves(child, path + (f"{label[0]}={label[1]}" if label[1] != "" else str(index),))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield path, value
+
+
+def compare(baseline, current, threshold: float):
+    old = dict(_leaves(baseline["results"]))
+    rows = []
+    for path, new_value in _leaves(current["results"]):
+        key = path[-1]
+        # max_ms is a single sample and too noisy to gate on
+        if path not in old or key == "max_ms" or not (key.endswith("_ms") or key.endswith("_per_s")):
+            continue
+        old_value = old[path]
+        if not old_value:
+            continue
+        change = (new_value - old_value) / old_value * 100
+        worse = change > threshold if key.endswith("_ms") else change < -threshold
+        rows.append(("/".join(path), old_value, new_value, change, worse))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10, help="Allowed change in percent")
+    parser.add_argument("--all", action="store_true", help="Print every metric, not only regressions")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    rows = compare(baseline, current, args.threshold)
+    print(f"{baseline.get('revision')} -> {current.get('revision')} ({len(rows)} metrics, threshold {args.threshold}%)")
+    regressions = 0
+    for name, old_value, new_value, change, worse in rows:
+        regressions += worse
+        if worse or args.all:
+            flag = "REGRESSION" if worse else ""
+            print(f"{name:<60} {old_value:>12} -> {new_value:>12} {change:>+8.1f}% {flag}")
+    print(f"{regressions} regression(s)")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Concurrent reviewer simulation against a running API.
+
+Each simulated reviewer logs in as one of the seeded users and repeats the
+TaskWorkspace loop for a fixed time:
+
+    GET  /projects/{id}/tasks/next
+    POST /annotations/batch       (--points points inside the task)
+    GET  /projects/{id}/progress
+
+Requests go over HTTP to a real server (uvicorn with its workers, pool and
+middleware), so the numbers include everything a browser would see except
+the network. Reports throughput in completed tasks per second and
+p50/p95/p99 latency per step and for the whole loop.
+
+    python -m benchmarks.seed_data --grid 300 --users 500 --manifest bench-manifest.json
+    uvicorn main:app --workers 4 &
+    python -m benchmarks.load_reviewers --manifest bench-manifest.json \\
+        --reviewers 50 200 --duration 60 --output load.json
+
+Needs httpx (see benchmarks/requirements.txt).
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+
+import httpx
+
+from benchmarks.common import summarize, write_results
+
+STEPS = ("next_task", "submit", "progress")
+
+
+def _task_points(geometry, count: int, rng: random.Random):
+    """Points inside the task polygon: jittered towards its centroid from its vertices."""
+    ring = geometry["coordinates"][0][:-1]
+    cx = sum(x for x, _ in ring) / len(ring)
+    cy = sum(y for _, y in ring) / len(ring)
+    points = []
+    for _ in range(count):
+        x, y = rng.choice(ring)
+        share = rng.uniform(0.1, 0.9)
+        points.append((cx + (x - cx) * share, cy + (y - cy) * share))
+    return points
+
+
+class Reviewer:
+    def __init__(self, client: httpx.AsyncClient, username: str, password: str, project_id: int,
+                 points: int, seed: int):
+        self.client = client
+        self.username = username
+        self.password = password
+        self.project_id = project_id
+        self.points = points
+        self.rng = random.Random(seed)
+        self.headers = {}
+        self.samples = {step: [] for step in STEPS + ("loop",)}
+        self.errors = Counter()
+        self.tasks = 0
+
+    async def login(self):
+        response = await self.client.post("/token", data={"username": self.username, "password": self.password})
+        response.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def _timed(self, step: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        response = await self.client.request(method, url, headers=self.headers, **kwargs)
+        self.samples[step].append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            self.errors[f"{step}:{response.status_code}"] += 1
+        return response
+
+    async def run(self, deadline: float):
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            task = await self._timed("next_task", "GET", f"/projects/{self.project_id}/tasks/next")
+            if task.status_code == 404:
+                # Nothing left for this reviewer
+                return
+            if task.status_code >= 400:
+                continue
+            task = task.json()
+
+            annotations = [
+                {"geom": f"POINT({x} {y})", "label_type": f"circle:{self.rng.choice((0, 5, 10, 15, 20))}"}
+                for x, y in _task_points(task["geometry"], self.points, self.rng)
+            ]
+            submitted = await self._timed("submit", "POST", "/annotations/batch", json={
+                "project_id": self.project_id, "subdivision_id": task["id"], "annotations": annotations
+            })
+            await self._timed("progress", "GET", f"/projects/{self.project_id}/progress")
+            if submitted.status_code < 400:
+                self.tasks += 1
+                self.samples["loop"].append((time.perf_counter() - started) * 1000)
+
+
+async def run_level(args, manifest, reviewers: int):
+    limits = httpx.Limits(max_connections=reviewers, max_keepalive_connections=reviewers)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        project_ids = [project["id"] for project in manifest["projects"]]
+        users = manifest["usernames"]
+        if reviewers > len(users):
+            raise SystemExit(f"Only {len(users)} seeded users for {reviewers} reviewers; seed more with --users")
+
+        crowd = [
+            Reviewer(client, users[i], manifest["password"], project_ids[i % len(project_ids)], args.points, i)
+            for i in range(reviewers)
+        ]
+        await asyncio.gather(*(reviewer.login() for reviewer in crowd))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(reviewer.run(started + args.duration) for reviewer in crowd))
+        elapsed = time.perf_counter() - started
+
+    tasks = sum(reviewer.tasks for reviewer in crowd)
+    errors = sum((reviewer.errors for reviewer in crowd), Counter())
+    result = {
+        "reviewers": reviewers,
+        "elapsed_s": round(elapsed, 2),
+        "tasks": tasks,
+        "tasks_per_s": round(tasks / elapsed, 2),
+        "errors": dict(errors),
+    }
+    for step in STEPS + ("loop",):
+        result[step] = summarize([sample for reviewer in crowd for sample in reviewer.samples[step]])
+    return result
+
+
+async def bench(args, manifest):
+    results = []
+    for reviewers in args.reviewers:
+        row = await run_level(args, manifest, reviewers)
+        results.append(row)
+        print(
+            f"{reviewers:>5} reviewers | {row['tasks_per_s']:>8} tasks/s"
+            f" | loop p50 {row['loop'].get('p50_ms')} ms p95 {row['loop'].get('p95_ms')} ms"
+            f" p99 {row['loop'].get('p99_ms')} ms | errors {sum(row['errors'].values())}"
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--manifest", default="bench-manifest.json", help="Written by benchmarks.seed_data")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--reviewers", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per concurrency level")
+    parser.add_argument("--points", type=int, default=3, help="Annotations per submitted task")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+
+    results = asyncio.run(bench(args, manifest))
+    if args.output:
+        write_results(args.output, "load_reviewers", args, results)
+
+
+if __name__ == "__main__":
+    main()
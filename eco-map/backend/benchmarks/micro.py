@@ -0,0 +1,175 @@
+"""
+In-process micro-benchmarks for the geometry-heavy code paths.
+
+  grid        grid_builder.build_grid_cells for square grids of --grid-sizes
+              cells per side (plus insert_subdivisions, rolled back, with --db)
+  serialize   JSON list responses (serialize.rows_response) and geobin
+              encoding for --rows synthetic grid cells, against building
+              GeoJSON dicts through shapely and json.dumps the old way
+  export      draining export.stream_annotations as ndjson and geojson for
+              the first project in a seed_data manifest (needs --manifest)
+
+Each case reports p50/p95/p99 over --repeat runs after one warm-up.
+
+    python -m benchmarks.micro --output micro.json
+    python -m benchmarks.micro --db --manifest bench-manifest.json --output micro.json
+"""
+import argparse
+import json
+from collections import namedtuple
+
+import shapely
+
+from benchmarks.common import time_repeated, write_results
+import geobin
+import grid as grid_builder
+import serialize
+
+_BOUNDARY = shapely.Polygon([(0, 0), (1, 0.1), (1.1, 1), (0.2, 1.2), (-0.1, 0.6)])
+
+Row = namedtuple("Row", ["id", "project_id", "completion_count", "geometry", "wkb"])
+
+
+class _MappedRow:
+    """Stand-in for a SQLAlchemy Row; serialize reads rows through ._mapping."""
+
+    __slots__ = ("_mapping", "id", "wkb")
+
+    def __init__(self, row: Row):
+        self._mapping = {
+            "id": row.id, "project_id": row.project_id,
+            "completion_count": row.completion_count, "geometry": row.geometry,
+        }
+        self.id = row.id
+        self.wkb = row.wkb
+
+    def __getattr__(self, name):
+        return self._mapping[name]
+
+
+def bench_grid(args):
+    results = []
+    for size in args.grid_sizes:
+        row = {
+            "cells_per_side": size,
+            "build": time_repeated(lambda: grid_builder.build_grid_cells(_BOUNDARY, size, size), args.repeat),
+            "build_clipped": time_repeated(
+                lambda: grid_builder.build_grid_cells(_BOUNDARY, size, size, clip=True), args.repeat
+            ),
+        }
+        if args.db:
+            row["insert"] = _bench_grid_insert(size, args.repeat)
+        results.append(row)
+        print(f"grid {size}x{size}: build p50 {row['build']['p50_ms']} ms")
+    return results
+
+
+def _bench_grid_insert(size: int, repeat: int):
+    from database import SessionLocal
+    import models
+
+    cells = grid_builder.build_grid_cells(_BOUNDARY, size, size)
+    db = SessionLocal()
+    try:
+        project = models.Project(name="bench-micro-grid", description="benchmark")
+        db.add(project)
+        db.flush()
+
+        def insert():
+            savepoint = db.begin_nested()
+            grid_builder.insert_subdivisions(db, project.id, cells)
+            savepoint.rollback()
+
+        return time_repeated(insert, repeat)
+    finally:
+        db.rollback()
+        db.close()
+
+
+def _synthetic_rows(count: int):
+    side = max(1, int(count ** 0.5))
+    cells = grid_builder.build_grid_cells(shapely.box(0, 0, 1, 1), side, side)[:count]
+    cells = shapely.set_precision(cells, 10 ** -serialize.GEOJSON_PRECISION)
+    geojson = shapely.to_geojson(cells)
+    wkb = shapely.to_wkb(cells)
+    return [Row(i + 1, 1, i % 7, geojson[i], wkb[i]) for i in range(len(cells))]
+
+
+def bench_serialize(args):
+    rows = [_MappedRow(row) for row in _synthetic_rows(args.rows)]
+
+    def shapely_and_json():
+        # The original path: WKB -> shapely -> GeoJSON dict -> json
+        json.dumps([
+            {"id": row.id, "project_id": row.project_id, "completion_count": row.completion_count,
+             "geometry": shapely.geometry.mapping(shapely.from_wkb(row.wkb))}
+            for row in rows
+        ]).encode()
+
+    results = {
+        "rows": len(rows),
+        "rows_response": time_repeated(lambda: serialize.rows_response(rows), args.repeat),
+        "geobin": time_repeated(
+            lambda: geobin.encode_rows(rows, [("id", geobin.INT32), ("completion_count", geobin.INT32)]),
+            args.repeat
+        ),
+        "shapely_json": time_repeated(shapely_and_json, args.repeat),
+        "bytes": {
+            "json": len(serialize.rows_response(rows).body),
+            "geobin": len(geobin.encode_rows(rows, [("id", geobin.INT32), ("completion_count", geobin.INT32)])),
+        },
+    }
+    print(
+        f"serialize {len(rows)} rows: rows_response p50 {results['rows_response']['p50_ms']} ms,"
+        f" geobin p50 {results['geobin']['p50_ms']} ms, shapely+json p50 {results['shapely_json']['p50_ms']} ms"
+    )
+    return results
+
+
+def bench_export(args):
+    import export
+
+    with open(args.manifest) as f:
+        project = json.load(f)["projects"][0]
+
+    results = {"project_id": project["id"]}
+    for format in export.FORMATS:
+        sizes = []
+
+        def drain():
+            sizes.append(sum(len(chunk) for chunk in export.stream_annotations(project["id"], format)))
+
+        results[format] = time_repeated(drain, args.repeat)
+        results[format]["bytes"] = sizes[-1]
+        seconds = results[format]["p50_ms"] / 1000
+        results[format]["mb_per_s"] = round(sizes[-1] / 1e6 / seconds, 1) if seconds else None
+        print(f"export {format}: p50 {results[format]['p50_ms']} ms, {results[format]['mb_per_s']} MB/s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", nargs="+", default=["grid", "serialize", "export"],
+                        choices=["grid", "serialize", "export"])
+    parser.add_argument("--grid-sizes", type=int, nargs="+", default=[100, 300, 1000])
+    parser.add_argument("--rows", type=int, default=50_000, help="Rows for the serialize case")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--db", action="store_true", help="Also time the grid insert against DATABASE_URL")
+    parser.add_argument("--manifest", help="seed_data manifest; enables the export case")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = {}
+    if "grid" in args.cases:
+        results["grid"] = bench_grid(args)
+    if "serialize" in args.cases:
+        results["serialize"] = bench_serialize(args)
+    if "export" in args.cases and args.manifest:
+        results["export"] = bench_export(args)
+
+    if args.output:
+        write_results(args.output, "micro", args, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Synthetic data generator for load tests and benchmarks.
+
+Seeds the database (the docker-compose `db` service, or any disposable
+PostGIS) with projects, their grids, reviewer accounts and annotations, then
+rebuilds task_submissions, completion counts and the progress counters from
+the annotations so every read path sees consistent data. Grids go through
+the same grid builder as POST /generate-grid. Annotations are generated in
+PostgreSQL with generate_series in batches, so millions of rows take seconds
+rather than hours. The random sequence is seeded (--seed) and the same
+arguments give the same data.
+
+A manifest with the project ids, usernames and password is written for the
+load test and the micro-benchmarks; --cleanup removes everything it lists.
+
+    python -m benchmarks.seed_data --projects 2 --grid 300 --users 200 \\
+        --annotations 2000000 --manifest bench-manifest.json
+    python -m benchmarks.seed_data --cleanup bench-manifest.json
+"""
+import argparse
+import json
+import time
+
+import shapely
+from geoalchemy2.elements import WKTElement
+from sqlalchemy import text
+
+from database import SessionLocal
+import grid as grid_builder
+import models
+import partitions
+import progress
+import run_init_db
+import security
+
+ANNOTATION_BATCH_SIZE = 500_000
+
+# Projects are laid out side by side, PROJECT_SPAN degrees wide
+PROJECT_SPAN = 1.0
+
+_INSERT_USERS = text("""
+    INSERT INTO users (username, hashed_password, is_admin, score)
+    SELECT :prefix || g, :hashed, false, 0 FROM generate_series(1, :n) AS g
+    RETURNING id, username
+""")
+
+# Uniformly random cell and reviewer per row; the point is the cell centroid
+_INSERT_ANNOTATIONS = text("""
+    INSERT INTO annotations (project_id, user_id, subdivision_id, label_type, label_category, magnitude, geom)
+    SELECT s.project_id, u.id, s.id, 'circle:' || m.magnitude, 'circle', m.magnitude, ST_Centroid(s.geom)
+    FROM (
+        SELECT :first_cell + floor(random() * :cells)::int AS cell_id,
+               floor(random() * :users)::int AS user_index,
+               (floor(random() * 5) * 5)::int AS magnitude
+        FROM generate_series(1, :n)
+    ) AS m
+    JOIN subdivisions s ON s.id = m.cell_id
+    JOIN users u ON u.id = (CAST(:user_ids AS integer[]))[m.user_index + 1]
+""")
+
+_REBUILD_SUBMISSIONS = text("""
+    INSERT INTO task_submissions (project_id, subdivision_id, user_id)
+    SELECT DISTINCT project_id, subdivision_id, user_id FROM annotations WHERE project_id = :pid
+    ON CONFLICT DO NOTHING
+""")
+
+_REBUILD_COMPLETION_COUNTS = text("""
+    UPDATE subdivisions s SET completion_count = c.n
+    FROM (
+        SELECT subdivision_id, count(*) AS n FROM task_submissions
+        WHERE project_id = :pid GROUP BY subdivision_id
+    ) AS c
+    WHERE s.id = c.subdivision_id
+""")
+
+
+def seed_users(db, count: int, password: str, prefix: str):
+    hashed = security.get_password_hash(password)
+    rows = db.execute(_INSERT_USERS, {"prefix": prefix, "hashed": hashed, "n": count}).all()
+    return [user_id for user_id, _ in rows], [username for _, username in rows]
+
+
+def seed_project(db, index: int, grid_size: int, prefix: str):
+    boundary = shapely.box(index * PROJECT_SPAN, 0, (index + 1) * PROJECT_SPAN, PROJECT_SPAN)
+    project = models.Project(
+        name=f"{prefix}project-{index}",
+        description="synthetic benchmark project",
+        boundary_geom=WKTElement(boundary.wkt, srid=4326),
+    )
+    db.add(project)
+    db.flush()
+    partitions.create(db, project.id)
+
+    cells = grid_builder.build_grid_cells(boundary, grid_size, grid_size)
+    cell_ids = grid_builder.insert_subdivisions(db, project.id, cells)
+    return project.id, min(cell_ids), len(cell_ids)
+
+
+def seed_annotations(db, first_cell: int, cells: int, user_ids, count: int):
+    written = 0
+    while written < count:
+        n = min(ANNOTATION_BATCH_SIZE, count - written)
+        db.execute(_INSERT_ANNOTATIONS, {
+            "first_cell": first_cell, "cells": cells, "users": len(user_ids), "user_ids": user_ids, "n": n
+        })
+        db.commit()
+        written += n
+        print(f"    {written}/{count} annotations")
+
+
+def rebuild_counters(db, project_id: int):
+    db.execute(_REBUILD_SUBMISSIONS, {"pid": project_id})
+    db.execute(_REBUILD_COMPLETION_COUNTS, {"pid": project_id})
+    progress.refresh_project_stats(db, project_id, include_users=True)
+    db.commit()
+
+
+def seed(args):
+    prefix = f"bench-{time.time_ns()}-"
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT setseed(:seed)"), {"seed": args.seed})
+        user_ids, usernames = seed_users(db, args.users, args.password, prefix)
+        db.commit()
+        print(f"Seeded {len(user_ids)} users")
+
+        projects = []
+        per_project = args.annotations // args.projects
+        for index in range(args.projects):
+            started = time.perf_counter()
+            project_id, first_cell, cells = seed_project(db, index, args.grid, prefix)
+            db.commit()
+            print(f"Project {project_id}: {cells} cells")
+            seed_annotations(db, first_cell, cells, user_ids, per_project)
+            rebuild_counters(db, project_id)
+            print(f"Project {project_id} seeded in {time.perf_counter() - started:.1f} s")
+            projects.append({"id": project_id, "cells": cells, "annotations": per_project})
+
+        for table in ("users", "subdivisions", "annotations", "task_submissions"):
+            db.execute(text(f"ANALYZE {table}"))
+        db.commit()
+    finally:
+        db.close()
+
+    return {
+        "prefix": prefix,
+        "seed": args.seed,
+        "projects": projects,
+        "user_ids": user_ids,
+        "usernames": usernames,
+        "password": args.password,
+    }
+
+
+def cleanup(manifest):
+    db = SessionLocal()
+    try:
+        project_ids = [project["id"] for project in manifest["projects"]]
+        for project_id in project_ids:
+            partitions.drop(db, project_id)
+        for table in ("task_leases", "task_submissions", "project_user_stats", "project_stats", "subdivisions"):
+            db.execute(text(f"DELETE FROM {table} WHERE project_id = ANY(:ids)"), {"ids": project_ids})
+        db.execute(text("DELETE FROM projects WHERE id = ANY(:ids)"), {"ids": project_ids})
+        db.execute(text("DELETE FROM annotations WHERE user_id = ANY(:ids)"), {"ids": manifest["user_ids"]})
+        db.execute(text("DELETE FROM users WHERE id = ANY(:ids)"), {"ids": manifest["user_ids"]})
+        db.commit()
+    finally:
+        db.close()
+    print(f"Removed {len(project_ids)} projects and {len(manifest['user_ids'])} users")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=1)
+    parser.add_argument("--grid", type=int, default=100, help="Cells per side of each project grid")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--annotations", type=int, default=100_000, help="Total across all projects")
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--seed", type=float, default=0.42, help="PostgreSQL setseed() value, -1 to 1")
+    parser.add_argument("--manifest", default="bench-manifest.json")
+    parser.add_argument("--cleanup", metavar="MANIFEST", help="Delete the data listed in a manifest and exit")
+    args = parser.parse_args()
+
+    if args.cleanup:
+        with open(args.cleanup) as f:
+            cleanup(json.load(f))
+        return
+
+    run_init_db.upgrade()
+    manifest = seed(args)
+    with open(args.manifest, "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Manifest written to {args.manifest}")
+
+
+if __name__ == "__main__":
+    main()
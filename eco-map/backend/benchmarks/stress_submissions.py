@@ -0,0 +1,148 @@
+"""
+Concurrency stress test for the annotation submission write path.
+
+Many threads submit every cell of a small synthetic grid for many users, with
+each submission sent twice so duplicates race each other. Afterwards the
+completion counters, task_submissions rows and cached progress counters must
+match exactly; the script exits non-zero if anything was lost or doubled.
+
+    python -m benchmarks.stress_submissions --users 50 --cells 20 --workers 32
+"""
+import argparse
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func, text
+
+from database import SessionLocal
+import models
+import run_init_db
+import progress
+import submissions
+
+
+def seed(db, users: int, cells: int):
+    project = models.Project(name="bench-stress-submissions", description="benchmark")
+    db.add(project)
+    db.flush()
+    user_ids = []
+    for i in range(users):
+        user = models.User(username=f"bench-stress-{time.time_ns()}-{i}", hashed_password="x")
+        db.add(user)
+        db.flush()
+        user_ids.append(user.id)
+    db.execute(text("""
+        INSERT INTO subdivisions (project_id, geom, completion_count)
+        SELECT :pid, ST_MakeEnvelope(g, 0, g + 1, 1, 4326), 0
+        FROM generate_series(0, :cells - 1) AS g
+    """), {"pid": project.id, "cells": cells})
+    progress.refresh_project_stats(db, project.id)
+    db.commit()
+    cell_ids = [row.id for row in db.query(models.Subdivision.id).filter(models.Subdivision.project_id == project.id)]
+    return project.id, user_ids, cell_ids
+
+
+def submit(project_id: int, user_id: int, cell_id: int, points: int):
+    db = SessionLocal()
+    try:
+        annotations = [(f"POINT({cell_id % 1000 + 0.5} 0.5)", "circle:10")] * points
+        accepted = submissions.record_submissions(
+            db, [submissions.Submission(project_id, cell_id, user_id, annotations)]
+        )
+        db.commit()
+        return len(accepted)
+    finally:
+        db.close()
+
+
+def verify(db, project_id: int, user_ids, cell_ids, points: int):
+    errors = []
+    expected = len(user_ids)
+
+    counts = dict(db.query(models.Subdivision.id, models.Subdivision.completion_count).filter(
+        models.Subdivision.project_id == project_id
+    ))
+    wrong = {cell: count for cell, count in counts.items() if count != expected}
+    if wrong:
+        errors.append(f"{len(wrong)} cells with completion_count != {expected}: {list(wrong.items())[:5]}")
+
+    claimed = db.query(func.count(models.TaskSubmission.id)).filter(
+        models.TaskSubmission.project_id == project_id
+    ).scalar()
+    if claimed != expected * len(cell_ids):
+        errors.append(f"task_submissions has {claimed} rows, expected {expected * len(cell_ids)}")
+
+    written = db.query(func.count(models.Annotation.id)).filter(
+        models.Annotation.project_id == project_id
+    ).scalar()
+    if written != expected * len(cell_ids) * points:
+        errors.append(f"annotations has {written} rows, expected {expected * len(cell_ids) * points}")
+
+    cached = db.query(models.ProjectStats).filter(models.ProjectStats.project_id == project_id).one()
+    cached = (cached.total_subtasks, cached.completed_subtasks, cached.zero_completed_subtasks, cached.completion_sum)
+    fresh = progress.refresh_project_stats(db, project_id)
+    fresh = (fresh.total_subtasks, fresh.completed_subtasks, fresh.zero_completed_subtasks, fresh.completion_sum)
+    if cached != fresh:
+        errors.append(f"project_stats drifted: cached {cached}, recomputed {fresh}")
+
+    per_user = db.query(models.ProjectUserStats).filter(models.ProjectUserStats.project_id == project_id).all()
+    drifted = [row.user_id for row in per_user if row.subdivisions_completed != len(cell_ids)
+               or row.annotation_count != len(cell_ids) * points]
+    if drifted or len(per_user) != len(user_ids):
+        errors.append(f"project_user_stats wrong for {len(drifted)} users ({len(per_user)} rows)")
+
+    db.rollback()
+    return errors
+
+
+def cleanup(db, project_id: int, user_ids):
+    for table in ("annotations", "task_submissions", "task_leases", "project_user_stats", "project_stats", "subdivisions"):
+        db.execute(text(f"DELETE FROM {table} WHERE project_id = :pid"), {"pid": project_id})
+    db.execute(text("DELETE FROM projects WHERE id = :pid"), {"pid": project_id})
+    db.execute(text("DELETE FROM users WHERE id = ANY(:ids)"), {"ids": user_ids})
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--cells", type=int, default=20)
+    parser.add_argument("--points", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded rows for inspection")
+    args = parser.parse_args()
+
+    run_init_db.upgrade()
+    db = SessionLocal()
+    project_id, user_ids, cell_ids = seed(db, args.users, args.cells)
+
+    # Every task twice, so the duplicate races the original
+    work = [(user, cell) for user in user_ids for cell in cell_ids] * 2
+    random.shuffle(work)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        accepted = sum(pool.map(lambda uc: submit(project_id, uc[0], uc[1], args.points), work))
+    elapsed = time.perf_counter() - start
+
+    errors = verify(db, project_id, user_ids, cell_ids, args.points)
+    print(f"{len(work)} submissions ({accepted} accepted) from {args.workers} threads in {elapsed:.2f}s"
+          f" ({len(work) / elapsed:.0f}/s)")
+    if accepted != len(user_ids) * len(cell_ids):
+        errors.append(f"{accepted} submissions accepted, expected {len(user_ids) * len(cell_ids)}")
+
+    if not args.keep:
+        cleanup(db, project_id, user_ids)
+    db.close()
+
+    if errors:
+        for error in errors:
+            print(f"FAIL: {error}")
+        sys.exit(1)
+    print("OK: counters are exact")
+
+
+if __name__ == "__main__":
+    main()
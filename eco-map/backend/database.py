@@ -1,12 +1,39 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import os
 
+import metrics
+
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Same database through asyncpg for the async endpoints, unless set explicitly
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or make_url(DATABASE_URL).set(drivername="postgresql+asyncpg")
+
+# Connection pool settings, applied to each engine in each worker process.
+# There are two engines (sync and async), so one worker can open up to
+# 2 * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections, and a deployment
+# workers * 2 * (DB_POOL_SIZE + DB_MAX_OVERFLOW). Keep that below PostgreSQL's
+# max_connections (100 by default) minus what admin tools and migrations need.
+# The defaults allow 20 per worker, so four workers fit.
+POOL_SETTINGS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "5")),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes"),
+}
 
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, poolclass=metrics.timed_pool(QueuePool, "sync"), **POOL_SETTINGS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, poolclass=metrics.timed_pool(AsyncAdaptedQueuePool, "async"), **POOL_SETTINGS
+)
+# Objects stay readable after commit; lazy refreshes are not possible outside a greenlet
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -14,4 +41,8 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,107 @@
+"""
+Annotation export.
+
+Rows are read from a server-side cursor in chunks and PostGIS renders the
+geometry with ST_AsGeoJSON, so the API process never holds more than one
+chunk of a project in memory and never builds shapely objects for export.
+"""
+import orjson
+from sqlalchemy import select, func
+
+from database import SessionLocal
+import models
+import serialize
+
+EXPORT_CHUNK_SIZE = 5000
+MAX_PAGE_SIZE = 10000
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "geojson": "application/geo+json",
+}
+
+ANNOTATION_FIELDS = (
+    "id", "project_id", "subdivision_id", "user_id", "label_type",
+    "label_category", "magnitude", "created_at", "geometry",
+)
+
+
+def annotation_query(project_id: int, after_id: int = None, limit: int = None,
+                     min_magnitude: int = None, label_category: str = None, wkb: bool = False,
+                     fields: tuple = ANNOTATION_FIELDS):
+    """
+    Keyset-ordered select of a project's annotations with GeoJSON geometry text
+    (or WKB in a "wkb" column with wkb=True), optionally filtered on the
+    indexed label columns and limited to the named fields.
+    """
+    ann = models.Annotation
+    columns = [getattr(ann, name) for name in fields if name != "geometry"]
+    if wkb:
+        columns.append(func.ST_AsBinary(ann.geom).label("wkb"))
+    elif "geometry" in fields:
+        columns.append(serialize.geojson(ann.geom))
+    stmt = select(*columns).where(ann.project_id == project_id)
+    if wkb:
+        stmt = stmt.where(ann.geom.isnot(None))
+    if after_id is not None:
+        stmt = stmt.where(ann.id > after_id)
+    if min_magnitude is not None:
+        stmt = stmt.where(ann.magnitude >= min_magnitude)
+    if label_category is not None:
+        stmt = stmt.where(ann.label_category == label_category)
+    stmt = stmt.order_by(ann.id)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def _feature(row):
+    properties = {
+        "project_id": row.project_id,
+        "subdivision_id": row.subdivision_id,
+        "user_id": row.user_id,
+        "label_type": row.label_type,
+        "label_category": row.label_category,
+        "magnitude": row.magnitude,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+    }
+    # Geometry is already GeoJSON text from PostGIS, splice it in as-is
+    return orjson.dumps({
+        "type": "Feature",
+        "id": row.id,
+        "geometry": orjson.Fragment(row.geometry) if row.geometry is not None else None,
+        "properties": properties,
+    })
+
+
+def stream_annotations(project_id: int, format: str, after_id: int = None, limit: int = None,
+                       min_magnitude: int = None, label_category: str = None):
+    """
+    Yield the export as encoded chunks: one Feature per line for ndjson, or a
+    single FeatureCollection for geojson. Opens its own session because the
+    response body is produced after the request handler has returned.
+    """
+    db = SessionLocal()
+    try:
+        stmt = annotation_query(project_id, after_id, limit, min_magnitude, label_category).execution_options(
+            stream_results=True, yield_per=EXPORT_CHUNK_SIZE
+        )
+        result = db.execute(stmt)
+
+        if format == "geojson":
+            yield b'{"type":"FeatureCollection","features":['
+        first = True
+        for rows in result.partitions():
+            features = [_feature(row) for row in rows]
+            if format == "geojson":
+                chunk = b",".join(features)
+                if not first:
+                    chunk = b"," + chunk
+            else:
+                chunk = b"\n".join(features) + b"\n"
+            first = False
+            yield chunk
+        if format == "geojson":
+            yield b"]}"
+    finally:
+        db.close()
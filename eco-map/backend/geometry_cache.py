@@ -0,0 +1,108 @@
+"""
+Process-local cache of prepared project and subdivision geometries.
+
+Annotation writes check every point against the project boundary and the
+subdivision polygon. Keeping prepared shapely geometries in memory turns those
+checks into vectorized in-process tests instead of ST_Contains round trips.
+Boundaries are invalidated explicitly when a project changes; subdivision
+polygons never change once created.
+"""
+import os
+
+import numpy as np
+import shapely
+from geoalchemy2.shape import to_shape
+from sqlalchemy.orm import Session
+
+from cache import LRUCache
+import models
+
+BOUNDARY_CACHE_SIZE = int(os.getenv("BOUNDARY_CACHE_SIZE", "256"))
+SUBDIVISION_CACHE_SIZE = int(os.getenv("SUBDIVISION_CACHE_SIZE", "50000"))
+
+# Stored for projects that exist but have no boundary, so they are cached too
+NO_BOUNDARY = object()
+
+_boundaries = LRUCache(BOUNDARY_CACHE_SIZE)
+_subdivisions = LRUCache(SUBDIVISION_CACHE_SIZE)
+
+
+def _prepared(geom):
+    shape = to_shape(geom)
+    shapely.prepare(shape)
+    return shape
+
+
+def project_boundary(db: Session, project_id: int):
+    """
+    Prepared boundary of the project, NO_BOUNDARY if it has none, or None if
+    the project does not exist.
+    """
+    boundary = _boundaries.get(project_id)
+    if boundary is None:
+        row = db.query(models.Project.boundary_geom).filter(models.Project.id == project_id).first()
+        if row is None:
+            return None
+        boundary = _prepared(row.boundary_geom) if row.boundary_geom is not None else NO_BOUNDARY
+        _boundaries.set(project_id, boundary)
+    return boundary
+
+
+def subdivision_shape(db: Session, project_id: int, subdivision_id: int):
+    """
+    Prepared polygon of a subdivision in the project, or None if there is no
+    such subdivision.
+    """
+    entry = _subdivisions.get(subdivision_id)
+    if entry is None:
+        row = db.query(models.Subdivision.project_id, models.Subdivision.geom).filter(
+            models.Subdivision.id == subdivision_id
+        ).first()
+        if row is None or row.geom is None:
+            return None
+        entry = (row.project_id, _prepared(row.geom))
+        _subdivisions.set(subdivision_id, entry)
+
+    owner, shape = entry
+    return shape if owner == project_id else None
+
+
+def invalidate_project(project_id: int):
+    _boundaries.pop(project_id)
+
+
+def parse_points(wkts):
+    """
+    Parse WKT points into coordinate arrays. Returns (xs, ys, bad) where bad
+    lists the indexes of items that are not valid points.
+    """
+    geoms = shapely.from_wkt(np.array(wkts, dtype=object), on_invalid="ignore")
+    is_point = shapely.get_type_id(geoms) == shapely.GeometryType.POINT
+    is_point &= ~shapely.is_empty(geoms)
+    bad = np.flatnonzero(~is_point).tolist()
+
+    xs = np.full(len(geoms), np.nan)
+    ys = np.full(len(geoms), np.nan)
+    xs[is_point] = shapely.get_x(geoms[is_point])
+    ys[is_point] = shapely.get_y(geoms[is_point])
+    return xs, ys, bad
+
+
+def point_inside(cell, boundary) -> str:
+    """
+    WKT of a point guaranteed to lie in both the cell and the boundary, even
+    when the cell is concave or only partly inside the project.
+    """
+    area = cell if boundary is NO_BOUNDARY else shapely.intersection(cell, boundary)
+    if shapely.is_empty(area):
+        area = cell
+    return shapely.point_on_surface(area).wkt
+
+
+def points_outside(shape, xs, ys):
+    """
+    Indexes of the points not covered by shape (points on the edge count as inside).
+    """
+    if shape is NO_BOUNDARY:
+        return []
+    return np.flatnonzero(~shapely.intersects_xy(shape, xs, ys)).tolist()
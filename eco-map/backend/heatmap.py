@@ -0,0 +1,132 @@
+"""
+Server-side heatmap aggregation.
+
+Annotations inside a bounding box are binned in PostGIS into a square or
+hexagonal grid, and only per-bin count / sum / max magnitude come back to the
+client. The payload grows with the number of bins rather than the number of
+annotations.
+
+Each point is assigned to its bin arithmetically and the points are grouped,
+so no grid is generated. Square bins are aligned to multiples of the cell
+size and hexagons to the lattice ST_HexagonGrid uses, so the same bins come
+back while a map is panned at one zoom level. Results are cached per project
+version.
+"""
+import math
+import os
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from cache import LRUCache
+
+HEATMAP_CACHE_SIZE = int(os.getenv("HEATMAP_CACHE_SIZE", "512"))
+MAX_RESOLUTION = 512
+# Upper bound on the cells over the snapped bbox, and so on the bins returned
+MAX_BINS = MAX_RESOLUTION * MAX_RESOLUTION
+SHAPES = ("square", "hex")
+
+# Annotations without a positive magnitude are left out
+_POINTS = """
+    SELECT a.id, a.geom, a.magnitude
+    FROM annotations a
+    WHERE a.project_id = :project_id
+      AND a.magnitude > 0
+      AND a.geom && ST_MakeEnvelope(:min_x, :min_y, :max_x, :max_y, 4326)
+"""
+
+_SQUARE_BINS = text(f"""
+    SELECT floor(ST_X(p.geom) / :size)::bigint AS col,
+           floor(ST_Y(p.geom) / :size)::bigint AS row,
+           count(*) AS count, sum(p.magnitude) AS sum, max(p.magnitude) AS max
+    FROM ({_POINTS}) p
+    GROUP BY 1, 2
+""")
+
+# Flat-topped hexagons with edge :size, centred on (col * 1.5 * size,
+# row * sqrt(3) / 2 * size) where col and row are both even or both odd. In
+# those units the nearest centre is one of two candidates, and a point
+# belongs to the hexagon of the nearer one; ties go to the even centre, so a
+# point on a shared edge is counted once.
+_HEX_BINS = text(f"""
+    SELECT h.col::bigint AS col, h.row::bigint AS row,
+           count(*) AS count, sum(p.magnitude) AS sum, max(p.magnitude) AS max
+    FROM ({_POINTS}) p
+    CROSS JOIN LATERAL (
+        SELECT ST_X(p.geom) / (1.5 * :size) AS u, ST_Y(p.geom) / (sqrt(3) / 2 * :size) AS v
+    ) s
+    CROSS JOIN LATERAL (
+        SELECT 2 * round(s.u / 2) AS even_col, 2 * round(s.v / 2) AS even_row,
+               2 * floor(s.u / 2) + 1 AS odd_col, 2 * floor(s.v / 2) + 1 AS odd_row
+    ) c
+    CROSS JOIN LATERAL (
+        SELECT 3 * (s.u - c.even_col) ^ 2 + (s.v - c.even_row) ^ 2
+               <= 3 * (s.u - c.odd_col) ^ 2 + (s.v - c.odd_row) ^ 2 AS even
+    ) n
+    CROSS JOIN LATERAL (
+        SELECT CASE WHEN n.even THEN c.even_col ELSE c.odd_col END AS col,
+               CASE WHEN n.even THEN c.even_row ELSE c.odd_row END AS row
+    ) h
+    GROUP BY 1, 2
+""")
+
+_bins = LRUCache(HEATMAP_CACHE_SIZE)
+
+
+def _snap(bbox, size):
+    min_x, min_y, max_x, max_y = bbox
+    return (
+        math.floor(min_x / size) * size,
+        math.floor(min_y / size) * size,
+        math.ceil(max_x / size) * size,
+        math.ceil(max_y / size) * size,
+    )
+
+
+def _cell_count(bbox, size):
+    return round((bbox[2] - bbox[0]) / size) * round((bbox[3] - bbox[1]) / size)
+
+
+def aggregate(db: Session, project_id: int, version: int, bbox, resolution: int, shape: str = "square"):
+    """
+    Bin the project's annotations inside bbox (min_x, min_y, max_x, max_y in
+    degrees) into about `resolution` cells across. Returns a dict of parallel
+    arrays: bin centres x / y and count / sum / max magnitude.
+    """
+    # Round the cell size to a power of two so nearby viewports share bins. The
+    # longer side sets it, so a tall narrow bbox does not get tiny cells
+    extent = max(bbox[2] - bbox[0], bbox[3] - bbox[1])
+    size = 2.0 ** math.floor(math.log2(extent / resolution))
+    while _cell_count(_snap(bbox, size), size) > MAX_BINS:
+        size *= 2
+    bbox = _snap(bbox, size)
+
+    key = (project_id, version, shape, size, bbox)
+    cached = _bins.get(key)
+    if cached is not None:
+        return cached
+
+    params = dict(zip(("min_x", "min_y", "max_x", "max_y"), bbox), project_id=project_id, size=size)
+    if shape == "hex":
+        rows = db.execute(_HEX_BINS, params).all()
+        xs = [row.col * 1.5 * size for row in rows]
+        ys = [row.row * math.sqrt(3) / 2 * size for row in rows]
+    else:
+        rows = db.execute(_SQUARE_BINS, params).all()
+        xs = [(row.col + 0.5) * size for row in rows]
+        ys = [(row.row + 0.5) * size for row in rows]
+
+    result = {
+        "project_id": project_id,
+        "shape": shape,
+        "cell_size": size,
+        "bbox": list(bbox),
+        "x": xs,
+        "y": ys,
+        "count": [row.count for row in rows],
+        "sum": [int(row.sum) for row in rows],
+        "max": [row.max for row in rows],
+        "max_magnitude": max((row.max for row in rows), default=0),
+    }
+    _bins.set(key, result)
+    return result
@@ -0,0 +1,82 @@
+"""
+Conditional GETs for project reads.
+
+Every write that changes what a project read returns bumps
+project_stats.version: submissions in the write CTE, grid and task loads
+through refresh_project_stats, and project edits through progress.bump_version.
+A response's strong ETag is a hash of the endpoint, its parameters and the
+versions it was built from, so checking it costs one indexed lookup.
+A matching If-None-Match gets an empty 304. Otherwise the encoded body is
+served from a bounded in-process cache keyed by the ETag, and only a new
+version runs the real query. Stale entries are never read again and age out
+of the LRU.
+"""
+import hashlib
+import os
+
+from fastapi.responses import Response
+
+from cache import LRUCache
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+# Larger bodies are still served with an ETag but not kept in memory
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))
+
+# Clients may store responses but must revalidate them before each use
+CACHE_CONTROL = "private, no-cache"
+
+_responses = LRUCache(RESPONSE_CACHE_SIZE)
+
+
+def etag(*parts) -> str:
+    """Strong ETag over the given parts (endpoint, parameters, versions)."""
+    digest = hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def matches(if_none_match: str, tag: str) -> bool:
+    """If-None-Match test; per RFC 9110 it uses weak comparison."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == tag:
+            return True
+    return False
+
+
+def _headers(tag: str, vary: str = None) -> dict:
+    headers = {"ETag": tag, "Cache-Control": CACHE_CONTROL}
+    if vary:
+        headers["Vary"] = vary
+    return headers
+
+
+def respond(tag: str, if_none_match: str, build, vary: str = None) -> Response:
+    """
+    304 if the client already has `tag`, the cached body if the server has it,
+    otherwise build() (which returns a Response) and remember its body.
+    """
+    headers = _headers(tag, vary)
+    if matches(if_none_match, tag):
+        return Response(status_code=304, headers=headers)
+
+    cached = _responses.get(tag)
+    if cached is not None:
+        body, media_type, extra = cached
+        return Response(content=body, media_type=media_type, headers={**extra, **headers})
+
+    response = build()
+    if response.status_code == 200 and len(response.body) <= RESPONSE_CACHE_MAX_BYTES:
+        # Keep headers set by the endpoint (e.g. X-Next-Cursor) but not the computed ones
+        extra = {
+            name: value for name, value in response.headers.items()
+            if name not in ("content-length", "content-type")
+        }
+        _responses.set(tag, (response.body, response.media_type, extra))
+    response.headers.update(headers)
+    return response
+
+
+def clear():
+    _responses.clear()
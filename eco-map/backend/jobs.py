@@ -0,0 +1,160 @@
+"""
+In-process job runner for long admin operations.
+
+Jobs are recorded in the jobs table and executed on a small thread pool, so
+grid generation or bulk task uploads return a job id at once instead of
+holding an HTTP worker. The pool size bounds how many heavy jobs can compete
+with the interactive endpoints for database connections.
+
+A job function is called as fn(db, ctx, **params) with its own session. It
+reports progress through ctx.report(), which raises JobCancelled once a
+cancel was requested; the job's transaction is then rolled back.
+
+Jobs only live in the process that ran them. On startup the runner marks jobs
+left queued or running by a dead process as failed, so clients polling
+/jobs/{id} see the failure instead of waiting forever.
+"""
+import os
+import threading
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func, update
+
+from database import SessionLocal
+import models
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# A queued or running job not updated for this long is treated as lost at startup
+ORPHAN_AFTER_SECONDS = int(os.getenv("JOB_ORPHAN_AFTER_SECONDS", "600"))
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _update_job(job_id: int, **values):
+    db = SessionLocal()
+    try:
+        cancel_requested = db.execute(
+            update(models.Job).where(models.Job.id == job_id).values(**values)
+            .returning(models.Job.cancel_requested)
+        ).scalar()
+        db.commit()
+        return cancel_requested
+    finally:
+        db.close()
+
+
+class JobContext:
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+
+    def report(self, progress: int, total: int = None):
+        """
+        Record progress for the job. Raises JobCancelled if the job was cancelled.
+        """
+        values = {"progress": progress}
+        if total is not None:
+            values["total"] = total
+        if _update_job(self.job_id, **values):
+            raise JobCancelled()
+
+
+class JobRunner:
+    def __init__(self, max_workers: int = JOB_WORKERS):
+        self.max_workers = max_workers
+        self._executor = None
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ecomap-job")
+        self._fail_orphans()
+
+    def _fail_orphans(self):
+        """
+        Jobs left queued or running by a process that died never finish, so
+        mark them failed. Workers share the jobs table, so only jobs that have
+        not been updated for ORPHAN_AFTER_SECONDS count as orphaned.
+        """
+        db = SessionLocal()
+        try:
+            orphaned = db.execute(
+                update(models.Job)
+                .where(
+                    models.Job.status.in_(("queued", "running")),
+                    models.Job.updated_at < func.now() - timedelta(seconds=ORPHAN_AFTER_SECONDS),
+                )
+                .values(status="failed", error="Server restarted while the job was running")
+                .returning(models.Job.id)
+            ).scalars().all()
+            db.commit()
+        finally:
+            db.close()
+        if orphaned:
+            print(f"Marked orphaned jobs as failed: {orphaned}")
+
+    def shutdown(self):
+        with self._lock:
+            pending = [job_id for job_id, future in self._futures.items() if future.cancel()]
+        for job_id in pending:
+            _update_job(job_id, status="cancelled", error="Server shut down before the job started")
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, kind: str, fn, created_by: int, **params):
+        """
+        Record a queued job and schedule fn on the pool. Returns the Job row.
+        """
+        db = SessionLocal()
+        try:
+            job = models.Job(kind=kind, status="queued", created_by=created_by)
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+        finally:
+            db.close()
+
+        future = self._executor.submit(self._run, job.id, fn, params)
+        with self._lock:
+            self._futures[job.id] = future
+        future.add_done_callback(lambda _: self._forget(job.id))
+        return job
+
+    def cancel(self, job_id: int):
+        """
+        Request cancellation. A job that has not started yet is dropped at
+        once; a running job stops at its next progress report.
+        """
+        _update_job(job_id, cancel_requested=True)
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            _update_job(job_id, status="cancelled")
+
+    def _forget(self, job_id: int):
+        with self._lock:
+            self._futures.pop(job_id, None)
+
+    def _run(self, job_id: int, fn, params):
+        if _update_job(job_id, status="running"):
+            _update_job(job_id, status="cancelled")
+            return
+
+        db = SessionLocal()
+        try:
+            result = fn(db, JobContext(job_id), **params)
+            db.commit()
+        except JobCancelled:
+            db.rollback()
+            _update_job(job_id, status="cancelled")
+        except Exception as e:
+            db.rollback()
+            _update_job(job_id, status="failed", error=str(e))
+        else:
+            _update_job(job_id, status="succeeded", result=result)
+        finally:
+            db.close()
+
+
+runner = JobRunner()
@@ -0,0 +1,46 @@
+"""
+Annotation label parsing.
+
+Labels arrive as "category:magnitude" strings (e.g. "circle:25"). They are
+split once on the write path into annotations.label_category and
+annotations.magnitude so filters and aggregations run on indexed columns.
+The SQL expressions below apply the same rules to rows written before the
+columns existed.
+
+Rules, matching what the map pages used to do in the browser:
+  - the category is everything before the first ':'
+  - a label without a magnitude part counts as DEFAULT_MAGNITUDE
+  - otherwise the leading integer of the magnitude part is used, or None if
+    there is none
+"""
+import re
+
+DEFAULT_MAGNITUDE = 10
+# Recorded for a task where the reviewer found nothing
+NOTHING_FOUND_LABEL = "circle:0"
+
+_MAGNITUDE = re.compile(r"\s*\+?([0-9]{1,9})")
+
+
+def parse_label(label_type: str):
+    """
+    Return (label_category, magnitude) for a raw label string.
+    """
+    if label_type is None:
+        return None, None
+    category, _, magnitude = label_type.partition(":")
+    magnitude = magnitude.split(":", 1)[0]
+    if magnitude == "":
+        return category, DEFAULT_MAGNITUDE
+    match = _MAGNITUDE.match(magnitude)
+    return category, int(match.group(1)) if match else None
+
+
+LABEL_CATEGORY_SQL = "split_part(label_type, ':', 1)"
+
+MAGNITUDE_SQL = rf"""
+    CASE
+        WHEN split_part(label_type, ':', 2) = '' THEN {DEFAULT_MAGNITUDE}
+        ELSE substring(split_part(label_type, ':', 2) from '^\s*\+?([0-9]{{1,9}})')::int
+    END
+"""
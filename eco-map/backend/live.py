@@ -0,0 +1,252 @@
+"""
+Live project progress pushed to clients over Server-Sent Events.
+
+The submission write path stages deltas on the session with stage(): each
+touched subdivision's new completion_count and the project's counters as the
+claim CTE left them. After the session commits they are published to the
+in-process broker; a rollback drops them. So clients only ever see committed
+counts, whichever path did the write (direct, batch or write-behind).
+
+The broker coalesces per project: the first delta starts a LIVE_COALESCE_MS
+timer, later deltas merge into the pending event, and one event goes out
+when the timer fires. A hot project therefore sends at most a few events per
+second however many submissions land. Counts only grow, so merging keeps the
+highest completion_count per cell and the counters with the highest version.
+
+A client that cannot keep up is not buffered without bound. Its queue is
+replaced by a single resync event, which tells it to re-read the full state.
+
+Pub/sub is per worker process. While a project has subscribers, the broker
+polls its counters every LIVE_POLL_SECONDS. If another worker (or a grid
+rebuild) moved the version past what was published here, it sends the
+counters with resync set, so clients converge under several workers too.
+"""
+import asyncio
+import os
+import threading
+
+import orjson
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+LIVE_COALESCE_MS = int(os.getenv("LIVE_COALESCE_MS", "250"))
+LIVE_SUBSCRIBER_QUEUE = int(os.getenv("LIVE_SUBSCRIBER_QUEUE", "32"))
+LIVE_KEEPALIVE_SECONDS = float(os.getenv("LIVE_KEEPALIVE_SECONDS", "15"))
+LIVE_POLL_SECONDS = float(os.getenv("LIVE_POLL_SECONDS", "5"))
+
+MEDIA_TYPE = "text/event-stream"
+
+_STAGED = "live_progress"
+
+
+def progress_payload(total_subtasks, completed_subtasks, zero_completed_subtasks, completion_sum,
+                     completion_threshold):
+    """Project counters in the shape of ProjectProgressResponse, without the per-user field."""
+    return {
+        "total_subtasks": total_subtasks,
+        "completed_subtasks": completed_subtasks,
+        "uncompleted_subtasks": total_subtasks - completed_subtasks,
+        "zero_completed_subtasks": zero_completed_subtasks,
+        "avg_completion_count": completion_sum / total_subtasks if total_subtasks else None,
+        "completion_threshold": completion_threshold,
+    }
+
+
+class _Pending:
+    __slots__ = ("subdivisions", "progress", "version", "resync")
+
+    def __init__(self):
+        self.subdivisions = {}
+        self.progress = None
+        self.version = -1
+        self.resync = False
+
+    def merge(self, subdivisions: dict, progress: dict = None, version: int = None, resync: bool = False):
+        for subdivision_id, count in subdivisions.items():
+            if count > self.subdivisions.get(subdivision_id, -1):
+                self.subdivisions[subdivision_id] = count
+        if progress is not None and version is not None and version > self.version:
+            self.progress = progress
+            self.version = version
+        self.resync = self.resync or resync
+
+    def event(self, project_id: int) -> bytes:
+        data = {
+            "project_id": project_id,
+            "version": self.version if self.version >= 0 else None,
+            "subdivisions": sorted(self.subdivisions.items()),
+            "progress": self.progress,
+            "resync": self.resync,
+        }
+        return b"event: progress\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+class Subscription:
+    def __init__(self, broker: "Broker", project_id: int):
+        self.broker = broker
+        self.project_id = project_id
+        self.queue = asyncio.Queue(maxsize=LIVE_SUBSCRIBER_QUEUE)
+
+    def send(self, message: bytes):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Too slow to follow the deltas; drop them and ask for a reload
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            resync = _Pending()
+            resync.resync = True
+            self.queue.put_nowait(resync.event(self.project_id))
+
+    async def stream(self, first: bytes = None):
+        """SSE body: the optional first event, then deltas, with keep-alive comments."""
+        try:
+            if first is not None:
+                yield first
+            while True:
+                try:
+                    yield await asyncio.wait_for(self.queue.get(), LIVE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+        finally:
+            self.broker.unsubscribe(self)
+
+
+class Broker:
+    """
+    Per-project fan-out. publish() may be called from any thread; events are
+    delivered on the event loop given to start().
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._read_progress = None
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._pending = {}
+        self._published_versions = {}
+        self._pollers = {}
+
+    def start(self, loop, read_progress):
+        """
+        read_progress(project_id) is an async callable returning
+        (version, progress payload) or None; it backs the cross-worker poll.
+        """
+        self._loop = loop
+        self._read_progress = read_progress
+
+    def stop(self):
+        for poller in self._pollers.values():
+            poller.cancel()
+        self._pollers.clear()
+        self._loop = None
+
+    def subscribe(self, project_id: int, version: int = -1) -> Subscription:
+        """Subscribe a client that has seen the project up to `version`."""
+        subscription = Subscription(self, project_id)
+        with self._lock:
+            self._subscribers.setdefault(project_id, set()).add(subscription)
+            known = self._published_versions.get(project_id, -1)
+            self._published_versions[project_id] = max(known, version)
+        if project_id not in self._pollers and self._read_progress is not None:
+            self._pollers[project_id] = asyncio.ensure_future(self._poll(project_id))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        project_id = subscription.project_id
+        with self._lock:
+            subscribers = self._subscribers.get(project_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if subscribers:
+                    return
+                del self._subscribers[project_id]
+                self._pending.pop(project_id, None)
+                self._published_versions.pop(project_id, None)
+        poller = self._pollers.pop(project_id, None)
+        if poller is not None:
+            poller.cancel()
+
+    def publish(self, project_id: int, subdivisions: dict, progress: dict = None, version: int = None,
+                resync: bool = False):
+        loop = self._loop
+        if loop is None:
+            return
+        with self._lock:
+            if project_id not in self._subscribers:
+                return
+            pending = self._pending.get(project_id)
+            schedule = pending is None
+            if schedule:
+                pending = self._pending[project_id] = _Pending()
+            pending.merge(subdivisions, progress, version, resync)
+        if schedule:
+            loop.call_soon_threadsafe(loop.call_later, LIVE_COALESCE_MS / 1000, self._flush, project_id)
+
+    def _flush(self, project_id: int):
+        with self._lock:
+            pending = self._pending.pop(project_id, None)
+            subscribers = list(self._subscribers.get(project_id, ()))
+            if pending is not None and pending.version >= 0:
+                known = self._published_versions.get(project_id, -1)
+                self._published_versions[project_id] = max(known, pending.version)
+        if pending is None:
+            return
+        message = pending.event(project_id)
+        for subscription in subscribers:
+            subscription.send(message)
+
+    async def _poll(self, project_id: int):
+        while True:
+            await asyncio.sleep(LIVE_POLL_SECONDS)
+            try:
+                current = await self._read_progress(project_id)
+            except Exception as e:
+                print(f"Live progress poll failed for project {project_id}: {e}")
+                continue
+            if current is None:
+                continue
+            version, progress = current
+            with self._lock:
+                known = self._published_versions.get(project_id, -1)
+                pending = self._pending.get(project_id)
+                if pending is not None:
+                    known = max(known, pending.version)
+            if version > known:
+                # Written elsewhere: cell deltas are unknown here, so clients reload them
+                self.publish(project_id, {}, progress, version, resync=True)
+
+
+broker = Broker()
+
+
+def snapshot_event(project_id: int, version: int, progress: dict) -> bytes:
+    """First event of a stream: the counters the client starts from."""
+    pending = _Pending()
+    pending.merge({}, progress, version)
+    return pending.event(project_id)
+
+
+def stage(db: Session, project_id: int, subdivisions: dict, progress: dict = None, version: int = None):
+    """Queue a delta for publication once `db` commits."""
+    staged = db.info.setdefault(_STAGED, {})
+    pending = staged.get(project_id)
+    if pending is None:
+        pending = staged[project_id] = _Pending()
+    pending.merge(subdivisions, progress, version)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_staged(session):
+    staged = session.info.pop(_STAGED, None)
+    if not staged:
+        return
+    for project_id, pending in staged.items():
+        broker.publish(
+            project_id, pending.subdivisions, pending.progress, pending.version if pending.version >= 0 else None
+        )
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_staged(session):
+    session.info.pop(_STAGED, None)
@@ -1,23 +1,116 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Depends, HTTPException, Query, Header, Response, UploadFile, File, status
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from sqlalchemy import func, text, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, text, and_, select, exists
 from geoalchemy2.elements import WKTElement
 from geoalchemy2.shape import to_shape 
-from shapely.geometry import mapping, box, shape
-from typing import List, Optional
+from shapely.geometry import mapping, shape
+from typing import List, Optional, Union
 from datetime import timedelta
+import os
+import shutil
+import tempfile
+import anyio
 
 # Local modules
-from database import engine, Base, get_db
+from database import engine, Base, get_db, SessionLocal, async_engine, get_async_db, AsyncSessionLocal
 import models
 import schemas
 import security 
+import principals
+import task_assignment
+import progress
+import export
+import grid as grid_builder
+import jobs
+import task_ingest
+import geometry_cache
+import submissions
+import write_behind
+import tiles
+import heatmap
+import serialize
+import geobin
+import viewport
+import http_cache
+import metrics
+import live
+import partitions
+from labels import NOTHING_FOUND_LABEL, parse_label
+
+# The schema is managed by Alembic: run `alembic upgrade head` before starting workers
+
+# ----------------------------------------------------------------
+# BACKGROUND TASKS
+# ----------------------------------------------------------------
+
+def _sweep_expired_leases():
+    db = SessionLocal()
+    try:
+        return task_assignment.release_expired_leases(db)
+    finally:
+        db.close()
+
+
+async def _lease_sweeper():
+    while True:
+        await asyncio.sleep(task_assignment.LEASE_SWEEP_INTERVAL_SECONDS)
+        try:
+            await run_in_threadpool(_sweep_expired_leases)
+        except Exception as e:
+            print(f"Lease sweep failed: {e}")
+
+
+async def _live_snapshot(db: AsyncSession, project_id: int):
+    """(version, progress payload) of the project's counters, or None if there are none yet."""
+    stats = await db.scalar(select(models.ProjectStats).where(models.ProjectStats.project_id == project_id))
+    if stats is None:
+        return None
+    return stats.version, live.progress_payload(
+        stats.total_subtasks, stats.completed_subtasks, stats.zero_completed_subtasks,
+        stats.completion_sum, stats.completion_threshold
+    )
+
+
+async def _read_live_progress(project_id: int):
+    async with AsyncSessionLocal() as db:
+        return await _live_snapshot(db, project_id)
 
-models.Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="EcoMap Backend")
+# Worker threads for the remaining synchronous endpoints (AnyIO's default is 40)
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    jobs.runner.start()
+    if write_behind.ENABLED:
+        write_behind.buffer.start()
+    lease_sweeper = asyncio.create_task(_lease_sweeper())
+    live.broker.start(asyncio.get_running_loop(), _read_live_progress)
+    yield
+    live.broker.stop()
+    lease_sweeper.cancel()
+    if write_behind.ENABLED:
+        # Flush queued annotations before the process exits
+        await run_in_threadpool(write_behind.buffer.stop)
+    jobs.runner.shutdown()
+    await async_engine.dispose()
+
+
+app = FastAPI(title="EcoMap Backend", lifespan=lifespan)
+
+metrics.instrument_engine(engine, "sync")
+metrics.instrument_engine(async_engine.sync_engine, "async")
+app.middleware("http")(metrics.middleware)
 
 origins = [
     "http://localhost:5173", 
@@ -33,36 +126,51 @@ app.add_middleware(
 )
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+# For endpoints that also accept the token in the query string
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
 # ----------------------------------------------------------------
 # AUTH DEPENDENCIES 
 # ----------------------------------------------------------------
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     """
-    Decodes the token to find the user. 
+    Decodes the token to find the user, from the principal cache when possible.
     If token is invalid or user doesn't exist -> 401 Error.
     """
+    return await _authenticate(token, db)
+
+
+async def _authenticate(
+    token: Optional[str], db: AsyncSession, scope: Optional[str] = None, project_id: Optional[int] = None
+) -> principals.Principal:
+    """
+    Principal for a token. Access tokens carry no scope; scoped tokens (see
+    create_stream_token) are only accepted where that scope and project are expected.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    if not token:
+        raise credentials_exception
     try:
         # Decode token
         payload = security.jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
     except security.jwt.JWTError:
         raise credentials_exception
-        
-    user = db.query(models.User).filter(models.User.username == username).first()
+    if payload.get("scope") != scope:
+        raise credentials_exception
+    if scope is not None and payload.get("project_id") != project_id:
+        raise credentials_exception
+
+    user = await db.run_sync(principals.resolve, payload)
     if user is None:
         raise credentials_exception
     return user
 
-def get_current_admin(current_user: models.User = Depends(get_current_user)):
+def get_current_admin(current_user: principals.Principal = Depends(get_current_user)):
     """
     Ensures the logged-in user has is_admin=True.
     """
@@ -91,7 +199,7 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
     # Create Token
     access_token_expires = timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data=principals.token_claims(user), expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -103,6 +211,18 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
 def read_root():
     return {"status": "eco-mapping online", "message": "Go to /docs to test the API"}
 
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    """Prometheus scrape endpoint for this worker process."""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/metrics/slow-queries")
+def read_slow_queries(current_user: principals.Principal = Depends(get_current_admin)):
+    """Recent statements slower than SLOW_QUERY_MS (admin only)."""
+    return metrics.slow_queries()
+
 # ----------------------------------------------------------------
 # USER ENDPOINTS
 # ----------------------------------------------------------------
@@ -133,27 +253,87 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
 
 
 @app.get("/users/me", response_model=schemas.UserResponse)
-def read_users_me(current_user: models.User = Depends(get_current_user)):
+def read_users_me(current_user: principals.Principal = Depends(get_current_user)):
     return current_user
 
 # ----------------------------------------------------------------
 # PROJECT ENDPOINTS
 # ----------------------------------------------------------------
 
+def _parse_fields(fields: Optional[str], available) -> tuple:
+    try:
+        return serialize.parse_fields(fields, available)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _with_next_cursor(response: Response, rows, limit: Optional[int]) -> Response:
+    """A full page means there may be more; the client passes this as after_id."""
+    if limit is not None and len(rows) == limit:
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+    return response
+
+
 @app.get("/projects/", response_model=List[schemas.ProjectResponse])
-def read_projects(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    projects = db.query(models.Project).filter(models.Project.is_active == True).offset(skip).limit(limit).all()
-    for project in projects:
-        if project.boundary_geom is not None:
-            project.geometry = mapping(to_shape(project.boundary_geom))
-    return projects
+def read_projects(
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(10, ge=1, le=export.MAX_PAGE_SIZE),
+    after_id: Optional[int] = None,
+    fields: Optional[str] = None,
+    bbox: Optional[str] = None,
+    zoom: Optional[int] = Query(None, ge=0, le=22),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Active projects. With bbox only those whose boundary is in view; with zoom
+    the boundaries are simplified to the detail that zoom level can show.
+    Pages are keyset ordered by id: pass the X-Next-Cursor header as after_id.
+    fields= picks the returned fields, e.g. fields=id,name to leave out geometry.
+    """
+    names = _parse_fields(fields, serialize.PROJECT_FIELDS)
+    in_view = [models.Project.is_active == True]
+    if after_id is not None:
+        in_view.append(models.Project.id > after_id)
+    if bbox is not None:
+        bounds = viewport.parse_bbox(bbox)
+        if bounds is None:
+            raise HTTPException(status_code=400, detail="bbox must be min_lng,min_lat,max_lng,max_lat")
+        in_view.append(viewport.intersects(models.Project.boundary_geom, bounds))
+
+    # The page is identified by its project ids and their versions
+    page = db.execute(
+        select(models.Project.id, func.coalesce(models.ProjectStats.version, 0))
+        .outerjoin(models.ProjectStats, models.ProjectStats.project_id == models.Project.id)
+        .where(*in_view)
+        .order_by(models.Project.id)
+        .offset(skip).limit(limit)
+    ).all()
+    project_ids = [project_id for project_id, _ in page]
+    tag = http_cache.etag("projects", names, zoom, limit, tuple(map(tuple, page)))
+
+    def build():
+        columns = [column for column in serialize.PROJECT_COLUMNS if column.key in names]
+        with_geometry = "geometry" in names
+        if with_geometry and zoom is None:
+            columns.append(serialize.geojson(models.Project.boundary_geom))
+        rows = db.execute(
+            select(*columns).where(models.Project.id.in_(project_ids)).order_by(models.Project.id)
+        ).all()
+        if with_geometry and zoom is not None:
+            response = serialize.rows_response(rows, viewport.project_boundaries(db, project_ids, zoom))
+        else:
+            response = serialize.rows_response(rows)
+        return _with_next_cursor(response, page, limit)
+
+    return http_cache.respond(tag, if_none_match, build)
 
 
 @app.post("/projects/", response_model=schemas.ProjectResponse)
 def create_project(
     project: schemas.ProjectCreate, 
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin)
+    current_user: principals.Principal = Depends(get_current_admin)
 ):
     """
     Create a new project.
@@ -167,42 +347,41 @@ def create_project(
         boundary_geom=WKTElement(project.boundary_geom, srid=4326)
     )
     db.add(new_project)
+    db.flush()
+    partitions.create(db, new_project.id)
+    progress.refresh_project_stats(db, new_project.id, completion_threshold=project.completion_threshold)
     db.commit()
     db.refresh(new_project)
     return new_project
 
 @app.get("/projects/{project_id}", response_model=schemas.ProjectResponse)
-def get_project(project_id: int, db: Session = Depends(get_db)):
-    project = db.query(models.Project).filter(models.Project.id == project_id).first()
-    if project is None:
+def get_project(project_id: int, if_none_match: Optional[str] = Header(None), db: Session = Depends(get_db)):
+    version = progress.project_version(db, project_id)
+    if version is None:
         raise HTTPException(status_code=404, detail="Project not found")
-    
-    # Convert Database Binary -> GeoJSON for the frontend map
-    if project.boundary_geom is not None:
-        project.geometry = mapping(to_shape(project.boundary_geom))
-    
-    return project
+    db.commit()
+
+    def build():
+        # GeoJSON for the frontend map comes straight from PostGIS
+        row = db.execute(
+            select(*serialize.PROJECT_COLUMNS, serialize.geojson(models.Project.boundary_geom))
+            .where(models.Project.id == project_id)
+        ).first()
+        return serialize.RawJSONResponse(serialize.row_dict(row))
+
+    return http_cache.respond(http_cache.etag("project", project_id, version), if_none_match, build)
 
 
 @app.get("/projects/{project_id}/tasks/next", response_model=schemas.SubdivisionResponse)
-def get_next_task(
+async def get_next_task(
     project_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: principals.Principal = Depends(get_current_user)
 ):
-    project = db.query(models.Project).filter(models.Project.id == project_id).first()
-    if project is None:
+    if not await db.scalar(select(exists().where(models.Project.id == project_id))):
         raise HTTPException(status_code=404, detail="Project not found")
 
-    completed_subq = db.query(models.Annotation.subdivision_id).filter(
-        models.Annotation.project_id == project_id,
-        models.Annotation.user_id == current_user.id
-    ).subquery()
-
-    task = db.query(models.Subdivision).filter(
-        models.Subdivision.project_id == project_id,
-        ~models.Subdivision.id.in_(completed_subq)
-    ).order_by(func.random()).first()
+    task = await db.run_sync(task_assignment.pick_next_task, project_id, current_user.id)
 
     if task is None:
         raise HTTPException(status_code=404, detail="No available tasks")
@@ -213,77 +392,201 @@ def get_next_task(
     return task
 
 
-@app.get("/projects/{project_id}/progress", response_model=schemas.ProjectProgressResponse)
-def get_project_progress(
+@app.post("/projects/{project_id}/tasks/lease", response_model=schemas.TaskLeaseResponse)
+async def lease_tasks(
     project_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    n: int = Query(5, ge=1, le=task_assignment.MAX_LEASE_BATCH),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: principals.Principal = Depends(get_current_user)
 ):
-    project = db.query(models.Project).filter(models.Project.id == project_id).first()
-    if project is None:
+    """
+    Reserve up to n tasks for the current user in one round trip.
+    Leased cells are not handed to other reviewers until the lease expires.
+    """
+    if not await db.scalar(select(exists().where(models.Project.id == project_id))):
         raise HTTPException(status_code=404, detail="Project not found")
 
-    completion_threshold = 10
-    total_subtasks = db.query(models.Subdivision).filter(models.Subdivision.project_id == project_id).count()
-    completed_subtasks = db.query(models.Subdivision).filter(
-        models.Subdivision.project_id == project_id,
-        models.Subdivision.completion_count >= completion_threshold
-    ).count()
-    uncompleted_subtasks = db.query(models.Subdivision).filter(
-        models.Subdivision.project_id == project_id,
-        models.Subdivision.completion_count < completion_threshold
-    ).count()
-    zero_completed_subtasks = db.query(models.Subdivision).filter(
-        models.Subdivision.project_id == project_id,
-        models.Subdivision.completion_count == 0
-    ).count()
-    avg_completion_count = db.query(func.avg(models.Subdivision.completion_count)).filter(
-        models.Subdivision.project_id == project_id
-    ).scalar()
-
-    user_completed = db.query(func.count(func.distinct(models.Annotation.subdivision_id))).filter(
-        models.Annotation.project_id == project_id,
-        models.Annotation.user_id == current_user.id
-    ).scalar()
+    tasks, expires_at = await db.run_sync(task_assignment.lease_tasks, project_id, current_user.id, n)
+
+    response_tasks = []
+    for task in tasks:
+        task_resp = schemas.SubdivisionResponse(
+            id=task.id,
+            project_id=task.project_id,
+            completion_count=task.completion_count
+        )
+        if task.geom is not None:
+            task_resp.geometry = mapping(to_shape(task.geom))
+        response_tasks.append(task_resp)
+    await db.commit()
+
+    return schemas.TaskLeaseResponse(project_id=project_id, expires_at=expires_at, tasks=response_tasks)
+
+
+@app.delete("/projects/{project_id}/tasks/lease")
+async def release_leases(
+    project_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: principals.Principal = Depends(get_current_user)
+):
+    """
+    Give back every task the current user still holds in the project.
+    """
+    released = await db.run_sync(task_assignment.release_lease, project_id, current_user.id)
+    await db.commit()
+    return {"status": "success", "released": released}
+
+
+@app.get("/projects/{project_id}/progress", response_model=schemas.ProjectProgressResponse)
+async def get_project_progress(
+    project_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: principals.Principal = Depends(get_current_user)
+):
+    # Cached counters: one lookup instead of a pass over the grid
+    row = (await db.execute(
+        select(models.ProjectStats, models.ProjectUserStats.subdivisions_completed).outerjoin(
+            models.ProjectUserStats,
+            and_(
+                models.ProjectUserStats.project_id == models.ProjectStats.project_id,
+                models.ProjectUserStats.user_id == current_user.id
+            )
+        ).where(models.ProjectStats.project_id == project_id)
+    )).first()
+
+    if row is None:
+        if not await db.scalar(select(exists().where(models.Project.id == project_id))):
+            raise HTTPException(status_code=404, detail="Project not found")
+        stats = await db.run_sync(progress.refresh_project_stats, project_id, include_users=True)
+        user_completed = await db.scalar(select(models.ProjectUserStats.subdivisions_completed).where(
+            models.ProjectUserStats.project_id == project_id,
+            models.ProjectUserStats.user_id == current_user.id
+        ))
+        await db.commit()
+    else:
+        stats, user_completed = row
 
     return schemas.ProjectProgressResponse(
         project_id=project_id,
-        total_subtasks=total_subtasks,
-        completed_subtasks=completed_subtasks,
-        uncompleted_subtasks=uncompleted_subtasks,
-        zero_completed_subtasks=zero_completed_subtasks,
-        avg_completion_count=avg_completion_count,
-        completion_threshold=completion_threshold,
-        user_completed=user_completed
+        total_subtasks=stats.total_subtasks,
+        completed_subtasks=stats.completed_subtasks,
+        uncompleted_subtasks=stats.total_subtasks - stats.completed_subtasks,
+        zero_completed_subtasks=stats.zero_completed_subtasks,
+        avg_completion_count=stats.completion_sum / stats.total_subtasks if stats.total_subtasks else None,
+        completion_threshold=stats.completion_threshold,
+        user_completed=user_completed or 0
+    )
+
+@app.post("/projects/{project_id}/events/token", response_model=schemas.StreamToken)
+async def create_stream_token(
+    project_id: int,
+    current_user: principals.Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Short-lived token for opening the project's event stream. EventSource
+    cannot send headers, so the stream takes a token in its URL; this one
+    expires quickly and only opens that stream, unlike the access token.
+    """
+    if not await db.scalar(select(exists().where(models.Project.id == project_id))):
+        raise HTTPException(status_code=404, detail="Project not found")
+    claims = {
+        "sub": current_user.username,
+        "uid": current_user.id,
+        "scope": security.STREAM_TOKEN_SCOPE,
+        "project_id": project_id,
+    }
+    token = security.create_access_token(
+        data=claims, expires_delta=timedelta(seconds=security.STREAM_TOKEN_EXPIRE_SECONDS)
+    )
+    return {"token": token, "expires_in": security.STREAM_TOKEN_EXPIRE_SECONDS}
+
+@app.get("/projects/{project_id}/events")
+async def stream_project_events(
+    project_id: int,
+    token: Optional[str] = None,
+    bearer: Optional[str] = Depends(optional_oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Server-Sent Events stream of the project's progress. The first event holds
+    the current counters; later ones carry coalesced deltas (cells with their
+    new completion_count and the new counters). An event with resync set means
+    deltas were missed and the client should reload. Authenticated by a
+    bearer header or, since EventSource cannot send headers, by a stream
+    token from POST /projects/{id}/events/token passed as ?token=.
+    """
+    if bearer:
+        await _authenticate(bearer, db)
+    else:
+        await _authenticate(token, db, scope=security.STREAM_TOKEN_SCOPE, project_id=project_id)
+
+    version = await db.run_sync(progress.project_version, project_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    snapshot = await _live_snapshot(db, project_id)
+    # Release the connection; the stream itself does not touch the database
+    await db.commit()
+
+    version, payload = snapshot
+    subscription = live.broker.subscribe(project_id, version)
+    return StreamingResponse(
+        subscription.stream(live.snapshot_event(project_id, version, payload)),
+        media_type=live.MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 @app.get("/users/me/projects", response_model=List[schemas.ProjectContributionResponse])
-def read_my_projects(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    # Join Projects and Annotations, filter by user_id, group by Project
-    results = db.query(
-        models.Project, 
-        func.count(models.Annotation.id).label('count')
-    ).join(models.Annotation)\
-     .filter(models.Annotation.user_id == current_user.id)\
-     .group_by(models.Project.id)\
-     .all()
-
-    response = []
-    for project, count in results:
-        proj_data = schemas.ProjectContributionResponse(
-            id=project.id,
-            name=project.name,
-            description=project.description,
-            nasa_layer_id=project.nasa_layer_id,
-            created_at=project.created_at,
-            is_active=project.is_active,
-            user_contribution_count=count
-        )
-        if project.boundary_geom is not None:
-            proj_data.geometry = mapping(to_shape(project.boundary_geom))
-        response.append(proj_data)
-        
-    return response
+def read_my_projects(
+    after_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=export.MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    zoom: Optional[int] = Query(None, ge=0, le=22),
+    current_user: principals.Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Projects the current user has annotated, with their annotation count read
+    from the per-user counters. Projects whose counters were never built
+    (no project_stats row yet) are counted from annotations instead. Keyset
+    paged, projected and simplified (zoom=) like /projects/.
+    """
+    names = _parse_fields(fields, serialize.PROJECT_FIELDS + ("user_contribution_count",))
+    user_stats = models.ProjectUserStats
+    ann = models.Annotation
+
+    has_stats = exists().where(models.ProjectStats.project_id == models.Project.id)
+    counted = select(
+        user_stats.project_id, user_stats.annotation_count.label("user_contribution_count")
+    ).where(user_stats.user_id == current_user.id, user_stats.annotation_count > 0)
+    uncounted = select(
+        ann.project_id, func.count(ann.id).label("user_contribution_count")
+    ).where(
+        ann.user_id == current_user.id,
+        ann.project_id.in_(select(models.Project.id).where(~has_stats))
+    ).group_by(ann.project_id)
+    contributions = counted.union_all(uncounted).subquery()
+
+    columns = [column for column in serialize.PROJECT_COLUMNS if column.key in names]
+    with_geometry = "geometry" in names
+    if with_geometry and zoom is None:
+        columns.append(serialize.geojson(models.Project.boundary_geom))
+    if "user_contribution_count" in names:
+        columns.append(contributions.c.user_contribution_count)
+
+    query = select(*columns).join(contributions, contributions.c.project_id == models.Project.id)
+    if after_id is not None:
+        query = query.where(models.Project.id > after_id)
+    query = query.order_by(models.Project.id)
+    if limit is not None:
+        query = query.limit(limit)
+
+    rows = db.execute(query).all()
+    if with_geometry and zoom is not None:
+        response = serialize.rows_response(rows, viewport.project_boundaries(db, [row.id for row in rows], zoom))
+    else:
+        response = serialize.rows_response(rows)
+    return _with_next_cursor(response, rows, limit)
 
 # ----------------------------------------------------------------
 # ASIGNER ENDPOINTS
@@ -293,7 +596,7 @@ def update_project_status(
     project_id: int,
     status_update: schemas.ProjectUpdate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin) 
+    current_user: principals.Principal = Depends(get_current_admin) 
 ):
     """
     Update project fields (description, is_active, etc).
@@ -307,8 +610,13 @@ def update_project_status(
         project.description = status_update.description
     if status_update.is_active is not None:
         project.is_active = status_update.is_active
+    if status_update.completion_threshold is not None:
+        progress.refresh_project_stats(db, project_id, completion_threshold=status_update.completion_threshold)
+    progress.bump_version(db, project_id)
     
     db.commit()
+    geometry_cache.invalidate_project(project_id)
+    viewport.invalidate_project(project_id)
     db.refresh(project)
     
     # Handle Geometry serialization for response
@@ -317,279 +625,565 @@ def update_project_status(
 
     return project
 
+@app.delete("/projects/{project_id}")
+def delete_project(
+    project_id: int,
+    archive_annotations: bool = False,
+    db: Session = Depends(get_db),
+    current_user: principals.Principal = Depends(get_current_admin)
+):
+    """
+    Delete a project with its grid, counters and annotations. The annotations
+    go with a partition drop, or with archive_annotations are detached into a
+    standalone table that outlives the project.
+    """
+    if not db.query(exists().where(models.Project.id == project_id)).scalar():
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    archived = partitions.detach(db, project_id) if archive_annotations else None
+    if archived is None:
+        partitions.drop(db, project_id)
+    for model in (models.TaskLease, models.TaskSubmission, models.ProjectUserStats, models.ProjectStats,
+                  models.Subdivision):
+        db.query(model).filter(model.project_id == project_id).delete(synchronize_session=False)
+    db.query(models.Project).filter(models.Project.id == project_id).delete(synchronize_session=False)
+    db.commit()
+
+    geometry_cache.invalidate_project(project_id)
+    viewport.invalidate_project(project_id)
+    return {"status": "success", "archived_table": archived}
+
 # ----------------------------------------------------------------
 # ANNOTATION ENDPOINTS
 # ----------------------------------------------------------------
 
-@app.post("/annotations/", response_model=schemas.AnnotationResponse)
-def create_annotation(
-    annotation: schemas.AnnotationCreate, 
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
-):
+def _validate_points(db: Session, project_id: int, subdivision_id: int, wkts: List[str]):
     """
-    Create an annotation and verify it lies within project boundaries.
+    Check annotation points against the cached project boundary and subdivision polygon.
+    Returns the point coordinates as (xs, ys) arrays.
     """
-
-    project = db.query(models.Project).filter(models.Project.id == annotation.project_id).first()
-    if not project:
+    boundary = geometry_cache.project_boundary(db, project_id)
+    if boundary is None:
         raise HTTPException(status_code=404, detail="Project not found")
-
-    subdivision = db.query(models.Subdivision).filter(
-        models.Subdivision.id == annotation.subdivision_id,
-        models.Subdivision.project_id == annotation.project_id
-    ).first()
-    if not subdivision:
+    cell = geometry_cache.subdivision_shape(db, project_id, subdivision_id)
+    if cell is None:
         raise HTTPException(status_code=404, detail="Subdivision not found")
 
-    existing = db.query(models.Annotation).filter(
-        models.Annotation.project_id == annotation.project_id,
-        models.Annotation.subdivision_id == annotation.subdivision_id,
-        models.Annotation.user_id == current_user.id
-    ).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="Task already completed by this user")
-
-    # GEOSPATIAL CHECK 
-    point_wkt = WKTElement(annotation.geom, srid=4326)
-    is_inside = db.scalar(func.ST_Contains(project.boundary_geom, point_wkt))
+    xs, ys, bad = geometry_cache.parse_points(wkts)
+    if bad:
+        raise HTTPException(status_code=400, detail=f"Invalid point geometry at index {bad}")
 
-    if not is_inside:
+    single = len(wkts) == 1
+    outside = geometry_cache.points_outside(boundary, xs, ys)
+    if outside:
         raise HTTPException(
-            status_code=400, 
-            detail="Location Error: This point is outside the project boundaries."
+            status_code=400,
+            detail="Location Error: This point is outside the project boundaries." if single
+            else f"Location Error: Points {outside} are outside the project boundaries."
         )
-
-    # Save Record
-    db_annotation = models.Annotation(
-            project_id=annotation.project_id,
-            subdivision_id=annotation.subdivision_id,
-            label_type=annotation.label_type,
-            geom=point_wkt,
-            user_id=current_user.id 
+    outside = geometry_cache.points_outside(cell, xs, ys)
+    if outside:
+        raise HTTPException(
+            status_code=400,
+            detail="Location Error: This point is outside the task area." if single
+            else f"Location Error: Points {outside} are outside the task area."
         )
+    return xs, ys
 
-    subdivision.completion_count += 1
 
-    db.add(db_annotation)
-    db.commit()
-    db.refresh(db_annotation)
-    
-    # Convert Binary -> GeoJSON 
-    if db_annotation.geom is not None:
-        db_annotation.geometry = mapping(to_shape(db_annotation.geom))
-        
-    return db_annotation
+def _nothing_found_point(db: Session, project_id: int, subdivision_id: int) -> str:
+    """
+    Point recorded for a task where the reviewer found nothing. It is picked
+    on the server so it always passes the area checks, whatever the cell shape.
+    """
+    boundary = geometry_cache.project_boundary(db, project_id)
+    if boundary is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    cell = geometry_cache.subdivision_shape(db, project_id, subdivision_id)
+    if cell is None:
+        raise HTTPException(status_code=404, detail="Subdivision not found")
+    return geometry_cache.point_inside(cell, boundary)
 
 
-@app.post("/annotations/batch")
-def create_annotation_batch(
-    batch: schemas.AnnotationBatchCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+@app.post("/annotations/", response_model=schemas.AnnotationResponse)
+async def create_annotation(
+    annotation: schemas.AnnotationCreate, 
+    db: AsyncSession = Depends(get_async_db),
+    current_user: principals.Principal = Depends(get_current_user)
 ):
-    project = db.query(models.Project).filter(models.Project.id == batch.project_id).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    subdivision = db.query(models.Subdivision).filter(
-        models.Subdivision.id == batch.subdivision_id,
-        models.Subdivision.project_id == batch.project_id
-    ).first()
-    if not subdivision:
-        raise HTTPException(status_code=404, detail="Subdivision not found")
+    """
+    Create an annotation and verify it lies within project boundaries.
+    """
+    # GEOSPATIAL CHECK against cached prepared geometries
+    xs, ys = await db.run_sync(
+        _validate_points, annotation.project_id, annotation.subdivision_id, [annotation.geom]
+    )
 
-    existing = db.query(models.Annotation).filter(
-        models.Annotation.project_id == batch.project_id,
-        models.Annotation.subdivision_id == batch.subdivision_id,
-        models.Annotation.user_id == current_user.id
-    ).first()
-    if existing:
+    # Claim the task, bump the counters and save the record in two statements
+    submission = submissions.Submission(
+        annotation.project_id, annotation.subdivision_id, current_user.id,
+        [(annotation.geom, annotation.label_type)]
+    )
+    result = (await db.run_sync(submissions.record_submissions, [submission])).get(submission[:3])
+    if result is None:
         raise HTTPException(status_code=400, detail="Task already completed by this user")
+    await db.commit()
+
+    annotation_id, created_at = result.annotations[0]
+    label_category, magnitude = parse_label(annotation.label_type)
+    return schemas.AnnotationResponse(
+        id=annotation_id,
+        project_id=annotation.project_id,
+        subdivision_id=annotation.subdivision_id,
+        user_id=current_user.id,
+        label_type=annotation.label_type,
+        label_category=label_category,
+        magnitude=magnitude,
+        geometry={"type": "Point", "coordinates": [float(xs[0]), float(ys[0])]},
+        created_at=created_at
+    )
+
+
+async def _buffer_submission(db: AsyncSession, submission: submissions.Submission):
+    """
+    Hand a validated submission to the write-behind buffer. Depending on
+    WRITE_BEHIND_ACK the response waits for the group commit or only for the
+    submission to be queued.
+    """
+    if write_behind.ACK_ON_ENQUEUE:
+        # Nothing will report the duplicate later, so reject it up front
+        already_done = await db.scalar(select(exists().where(
+            models.TaskSubmission.project_id == submission.project_id,
+            models.TaskSubmission.subdivision_id == submission.subdivision_id,
+            models.TaskSubmission.user_id == submission.user_id,
+        )))
+        if already_done:
+            raise HTTPException(status_code=400, detail="Task already completed by this user")
 
-    if not batch.annotations:
-        raise HTTPException(status_code=400, detail="No annotations provided")
-
-    created = 0
-    for item in batch.annotations:
-        point_wkt = WKTElement(item.geom, srid=4326)
-        db_annotation = models.Annotation(
-            project_id=batch.project_id,
-            subdivision_id=batch.subdivision_id,
-            label_type=item.label_type,
-            geom=point_wkt,
-            user_id=current_user.id
+    try:
+        # May wait for room in the queue, so keep it off the event loop
+        future = await run_in_threadpool(write_behind.buffer.submit, submission)
+    except write_behind.QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+    if write_behind.ACK_ON_ENQUEUE:
+        return {"status": "queued", "created": len(submission.annotations)}
+
+    try:
+        # Shielded so a timeout does not cancel the write itself
+        result = await asyncio.wait_for(
+            asyncio.shield(asyncio.wrap_future(future)), write_behind.WRITE_BEHIND_ACK_TIMEOUT
         )
-        db.add(db_annotation)
-        created += 1
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=503, detail="Timed out waiting for the annotation write", headers={"Retry-After": "1"}
+        )
+    except write_behind.QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    if result is None:
+        raise HTTPException(status_code=400, detail="Task already completed by this user")
+    return {"status": "success", "created": len(result.annotations)}
 
-    subdivision.completion_count += 1
-    db.commit()
 
-    return {"status": "success", "created": created}
+@app.post("/annotations/batch")
+async def create_annotation_batch(
+    batch: schemas.AnnotationBatchCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: principals.Principal = Depends(get_current_user)
+):
+    if batch.annotations:
+        # Every point must fall inside both the project and the task area
+        await db.run_sync(
+            _validate_points, batch.project_id, batch.subdivision_id, [item.geom for item in batch.annotations]
+        )
+        items = [(item.geom, item.label_type) for item in batch.annotations]
+    else:
+        # Nothing found: record a single magnitude 0 point inside the task
+        geom = await db.run_sync(_nothing_found_point, batch.project_id, batch.subdivision_id)
+        items = [(geom, NOTHING_FOUND_LABEL)]
+
+    submission = submissions.Submission(batch.project_id, batch.subdivision_id, current_user.id, items)
+    if write_behind.ENABLED:
+        return await _buffer_submission(db, submission)
+
+    result = (await db.run_sync(submissions.record_submissions, [submission])).get(submission[:3])
+    if result is None:
+        raise HTTPException(status_code=400, detail="Task already completed by this user")
+    await db.commit()
+
+    return {"status": "success", "created": len(result.annotations)}
 
 
 @app.get("/projects/{project_id}/annotations", response_model=List[schemas.AnnotationResponse])
 def get_project_annotations(
     project_id: int,
+    format: str = "json",
+    after_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=export.MAX_PAGE_SIZE),
+    min_magnitude: Optional[int] = None,
+    label_category: Optional[str] = None,
+    fields: Optional[str] = None,
+    accept: Optional[str] = Header(None),
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin)
+    current_user: principals.Principal = Depends(get_current_admin)
 ):
     """
-    Fetch all annotations for a project (admin only).
-    Returns annotations with geometry serialized to GeoJSON.
+    Fetch annotations for a project (admin only), optionally only those with
+    magnitude >= min_magnitude and/or the given label_category.
+    format=json returns a list, optionally one keyset page at a time with
+    after_id/limit; the next cursor is sent in the X-Next-Cursor header.
+    fields= limits the json fields, e.g. fields=id,magnitude.
+    format=ndjson or format=geojson streams the whole export from the database.
+    format=geobin (or Accept: application/vnd.ecomap.geobin) returns the list
+    in the compact binary layout described in geobin.py.
     """
+    if geobin.wants_geobin(accept):
+        format = "geobin"
+    if format not in ("json", "geobin") and format not in export.FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    names = _parse_fields(fields if format == "json" else None, export.ANNOTATION_FIELDS)
+
     project = db.query(models.Project).filter(models.Project.id == project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    annotations = db.query(models.Annotation).filter(
-        models.Annotation.project_id == project_id
-    ).all()
+    if format in export.FORMATS:
+        return StreamingResponse(
+            export.stream_annotations(project_id, format, after_id, limit, min_magnitude, label_category),
+            media_type=export.FORMATS[format],
+            headers={"Content-Disposition": f'attachment; filename="project-{project_id}-annotations.{format}"'}
+        )
 
-    # Convert geometry to GeoJSON for each annotation
-    result = []
-    for annotation in annotations:
-        if annotation.geom is not None:
-            annotation.geometry = mapping(to_shape(annotation.geom))
-        result.append(annotation)
+    rows = db.execute(export.annotation_query(
+        project_id, after_id, limit, min_magnitude, label_category, wkb=format == "geobin", fields=names
+    )).all()
+
+    if format == "geobin":
+        result = Response(geobin.encode_rows(rows, [
+            ("id", geobin.INT32),
+            ("subdivision_id", geobin.INT32),
+            ("user_id", geobin.INT32),
+            ("label_type", geobin.UTF8),
+            ("label_category", geobin.UTF8),
+            ("magnitude", geobin.INT32),
+            ("created_at", geobin.TIMESTAMP_MS),
+        ]), media_type=geobin.MEDIA_TYPE)
+    else:
+        result = serialize.rows_response(rows)
+    return _with_next_cursor(result, rows, limit)
+
+
+@app.get("/projects/{project_id}/heatmap", response_model=schemas.HeatmapResponse)
+def get_project_heatmap(
+    project_id: int,
+    bbox: str,
+    resolution: int = Query(64, ge=1, le=heatmap.MAX_RESOLUTION),
+    shape: str = "square",
+    db: Session = Depends(get_db),
+    current_user: principals.Principal = Depends(get_current_admin)
+):
+    """
+    Annotation magnitudes binned into a square or hex grid over bbox
+    (min_lng,min_lat,max_lng,max_lat), about `resolution` bins across.
+    """
+    if shape not in heatmap.SHAPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported shape: {shape}")
+    bounds = viewport.parse_bbox(bbox)
+    if bounds is None:
+        raise HTTPException(status_code=400, detail="bbox must be min_lng,min_lat,max_lng,max_lat")
+
+    version = progress.project_version(db, project_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    db.commit()
 
-    return result
+    return heatmap.aggregate(db, project_id, version, bounds, resolution, shape)
 
 # ----------------------------------------------------------------
 # SUBDIVISION ENDPOINTS
 # ----------------------------------------------------------------
 
-@app.post("/projects/{project_id}/generate-grid", response_model=List[schemas.SubdivisionResponse])
+def _generate_grid_job(db: Session, job: jobs.JobContext, project_id: int, rows: int, cols: int, clip: bool):
+    project = db.query(models.Project).filter(models.Project.id == project_id).first()
+    cells = grid_builder.build_grid_cells(to_shape(project.boundary_geom), rows, cols, clip=clip)
+    job.report(0, total=len(cells))
+    inserted = grid_builder.insert_subdivisions(db, project_id, cells, on_progress=job.report)
+    progress.refresh_project_stats(db, project_id)
+    return {"project_id": project_id, "subdivisions_created": len(inserted)}
+
+
+@app.post(
+    "/projects/{project_id}/generate-grid",
+    response_model=Union[List[schemas.SubdivisionResponse], schemas.GridSummaryResponse, schemas.JobResponse]
+)
 def generate_grid(
     project_id: int, 
     grid: schemas.GridRequest, 
+    response: Response,
+    summary: bool = False,
+    background: bool = False,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin) 
+    current_user: principals.Principal = Depends(get_current_admin) 
 ):
     """
     Generates a grid of subdivisions for a project.
+    With summary=true only the number of created cells is returned.
+    With background=true the grid is built by the job runner and a job is returned.
     """
     # Fetch Project
     project = db.query(models.Project).filter(models.Project.id == project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    # Get the bounds of the project geometry 
+    if background:
+        response.status_code = status.HTTP_202_ACCEPTED
+        job = jobs.runner.submit(
+            "generate_grid", _generate_grid_job, current_user.id,
+            project_id=project.id, rows=grid.rows, cols=grid.cols, clip=grid.clip
+        )
+        return schemas.JobResponse.model_validate(job)
+
+    # Build every cell at once and keep those touching the project shape
     project_shape = to_shape(project.boundary_geom)
-    minx, miny, maxx, maxy = project_shape.bounds
-
-    # Calculate step sizes
-    width = maxx - minx
-    height = maxy - miny
-    step_x = width / grid.cols
-    step_y = height / grid.rows
-
-    new_subdivisions = []
-
-    # Loop and Create Cells
-    for i in range(grid.cols):
-        for j in range(grid.rows):
-            cell_minx = minx + (i * step_x)
-            cell_maxx = minx + ((i + 1) * step_x)
-            cell_miny = miny + (j * step_y)
-            cell_maxy = miny + ((j + 1) * step_y)
-            cell_poly = box(cell_minx, cell_miny, cell_maxx, cell_maxy)
-            # Only keep cells that touch the project shape
-            if project_shape.intersects(cell_poly):
-                # Convert back to WKT
-                wkt_cell = cell_poly.wkt
-                sub = models.Subdivision(
-                    project_id=project.id,
-                    geom=WKTElement(wkt_cell, srid=4326),
-                    completion_count=0
-                )
-                db.add(sub)
-                new_subdivisions.append(sub)
+    cells = grid_builder.build_grid_cells(project_shape, grid.rows, grid.cols, clip=grid.clip)
+
+    inserted = grid_builder.insert_subdivisions(db, project.id, cells, with_geometry=not summary)
+    progress.refresh_project_stats(db, project.id)
     db.commit()
-    
-    response_data = []
-    for sub in new_subdivisions:
-        db.refresh(sub) 
-        sub_resp = schemas.SubdivisionResponse(
-            id=sub.id,
-            project_id=sub.project_id,
-            completion_count=sub.completion_count
-        )
-        if sub.geom is not None:
-            sub_resp.geometry = mapping(to_shape(sub.geom))
-        response_data.append(sub_resp)
 
-    return response_data
+    if summary:
+        return schemas.GridSummaryResponse(project_id=project.id, subdivisions_created=len(inserted))
+
+    return serialize.rows_response(inserted)
+
+
+def _subdivisions_response(db: Session, in_view: list, zoom: Optional[int], limit: Optional[int],
+                           names: tuple, as_geobin: bool):
+    sub = models.Subdivision
+    if as_geobin:
+        geom = sub.geom
+        if viewport.tolerance(zoom) is not None:
+            geom = func.ST_SimplifyPreserveTopology(geom, viewport.tolerance(zoom))
+        query = select(sub.id, sub.completion_count, func.ST_AsBinary(geom).label("wkb")).where(
+            *in_view, sub.geom.isnot(None)
+        )
+    else:
+        columns = [getattr(sub, name) for name in names if name != "geometry"]
+        if "geometry" in names:
+            columns.append(viewport.geojson(sub.geom, zoom))
+        query = select(*columns).where(*in_view)
+
+    query = query.order_by(sub.id)
+    if limit is not None:
+        query = query.limit(limit)
+    rows = db.execute(query).all()
+
+    if as_geobin:
+        response = Response(
+            geobin.encode_rows(rows, [("id", geobin.INT32), ("completion_count", geobin.INT32)]),
+            media_type=geobin.MEDIA_TYPE
+        )
+    else:
+        response = serialize.rows_response(rows)
+    return _with_next_cursor(response, rows, limit)
 
 
 @app.get("/projects/{project_id}/subdivisions", response_model=List[schemas.SubdivisionResponse])
 def get_subdivisions(
     project_id: int,
+    bbox: Optional[str] = None,
+    zoom: Optional[int] = Query(None, ge=0, le=22),
+    after_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=export.MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: principals.Principal = Depends(get_current_user)
 ):
     """
-    Fetch all subdivisions (grid squares) for a project.
+    Fetch the subdivisions (grid squares) of a project, as JSON or, with
+    Accept: application/vnd.ecomap.geobin, as compact binary. bbox limits them
+    to the ones in view and zoom simplifies their outlines. Keyset paged with
+    after_id/limit and X-Next-Cursor; fields= projects the JSON rows.
     """
-    project = db.query(models.Project).filter(models.Project.id == project_id).first()
-    if not project:
+    names = _parse_fields(fields, serialize.SUBDIVISION_FIELDS)
+    in_view = [models.Subdivision.project_id == project_id]
+    if after_id is not None:
+        in_view.append(models.Subdivision.id > after_id)
+    if bbox is not None:
+        bounds = viewport.parse_bbox(bbox)
+        if bounds is None:
+            raise HTTPException(status_code=400, detail="bbox must be min_lng,min_lat,max_lng,max_lat")
+        in_view.append(viewport.intersects(models.Subdivision.geom, bounds))
+
+    version = progress.project_version(db, project_id)
+    if version is None:
         raise HTTPException(status_code=404, detail="Project not found")
+    db.commit()
 
-    subdivisions = db.query(models.Subdivision).filter(
-        models.Subdivision.project_id == project_id
-    ).all()
+    as_geobin = geobin.wants_geobin(accept)
+    return http_cache.respond(
+        http_cache.etag("subdivisions", project_id, version, bbox, zoom, after_id, limit, names, as_geobin),
+        if_none_match,
+        lambda: _subdivisions_response(db, in_view, zoom, limit, names, as_geobin),
+        vary="Accept"
+    )
 
-    response_data = []
-    for sub in subdivisions:
-        sub_resp = schemas.SubdivisionResponse(
-            id=sub.id,
-            project_id=sub.project_id,
-            completion_count=sub.completion_count
-        )
-        if sub.geom is not None:
-            sub_resp.geometry = mapping(to_shape(sub.geom))
-        response_data.append(sub_resp)
 
-    return response_data
+@app.get("/projects/{project_id}/tiles/{layer}/{z}/{x}/{y}.mvt")
+def get_tile(
+    project_id: int,
+    layer: str,
+    z: int,
+    x: int,
+    y: int,
+    db: Session = Depends(get_db),
+    current_user: principals.Principal = Depends(get_current_user)
+):
+    """
+    Vector tile of the project grid, its annotations or their heat bins.
+    """
+    if layer not in tiles.LAYERS:
+        raise HTTPException(status_code=404, detail=f"Unknown tile layer. Use one of: {', '.join(tiles.LAYERS)}")
+    if not tiles.valid_tile(z, x, y):
+        raise HTTPException(status_code=400, detail="Tile coordinates out of range")
+
+    version = progress.project_version(db, project_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    db.commit()
+
+    tile = tiles.render_tile(db, project_id, version, layer, z, x, y)
+    return Response(content=tile, media_type=tiles.MEDIA_TYPE)
 
 # ----------------------------------------------------------------
 # BATCH TASKS ENDPOINTS
 # ----------------------------------------------------------------
 
+def _create_tasks_job(db: Session, job: jobs.JobContext, project_id: int, geoms: list):
+    job.report(0, total=len(geoms))
+    summary = task_ingest.ingest_tasks(db, project_id, geoms, on_progress=job.report)
+    progress.refresh_project_stats(db, project_id)
+    return summary
+
+
+def _upload_tasks_job(db: Session, job: jobs.JobContext, project_id: int, path: str, filename: str):
+    try:
+        with open(path, "rb") as f:
+            summary = task_ingest.ingest_tasks(
+                db, project_id, task_ingest.iter_upload(f, filename), on_progress=job.report
+            )
+    finally:
+        os.remove(path)
+    progress.refresh_project_stats(db, project_id)
+    return summary
+
+
 @app.post("/projects/{project_id}/tasks/batch")
 def create_batch_tasks(
     project_id: int, 
     batch: schemas.TaskList, 
+    response: Response,
+    background: bool = False,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin) 
+    current_user: principals.Principal = Depends(get_current_admin) 
 ):
     """
     REVIEW Mode: Upload a specific list of geometries instead of generating a grid.
+    Each task geometry may be WKT or GeoJSON. Invalid rows are skipped and
+    reported by index; the valid ones are loaded with COPY.
+    With background=true the upload is handed to the job runner and a job is returned.
     """
     project = db.query(models.Project).filter(models.Project.id == project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    created_count = 0
-    
-    # Loop through the list and save each as a subdivision
-    for task in batch.tasks:
-        try:
-            # Convert string input to WKT for PostGIS
-            poly_wkt = WKTElement(task.geom, srid=4326)
-            
-            new_subdivision = models.Subdivision(
-                project_id=project_id,
-                geom=poly_wkt,
-                completion_count=0
-            )
-            db.add(new_subdivision)
-            created_count += 1
-        except Exception as e:
-            print(f"Skipping bad geometry: {e}")
-            continue
+    geoms = [task.geom for task in batch.tasks]
 
+    if background:
+        response.status_code = status.HTTP_202_ACCEPTED
+        job = jobs.runner.submit("create_tasks", _create_tasks_job, current_user.id, project_id=project_id, geoms=geoms)
+        return schemas.JobResponse.model_validate(job)
+
+    summary = task_ingest.ingest_tasks(db, project_id, geoms)
+    progress.refresh_project_stats(db, project_id)
     db.commit()
     
-    return {"status": "success", "tasks_created": created_count}
\ No newline at end of file
+    return {"status": "success", **summary}
+
+
+@app.post("/projects/{project_id}/tasks/upload")
+def upload_tasks(
+    project_id: int,
+    response: Response,
+    file: UploadFile = File(...),
+    background: bool = False,
+    db: Session = Depends(get_db),
+    current_user: principals.Principal = Depends(get_current_admin)
+):
+    """
+    Upload task polygons from a GeoJSON FeatureCollection or an NDJSON file
+    (.ndjson/.geojsonl, one Feature or geometry per line).
+    """
+    project = db.query(models.Project).filter(models.Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    filename = file.filename or ""
+
+    if background:
+        # The upload is gone once the request ends, so hand the job its own copy
+        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as tmp:
+            shutil.copyfileobj(file.file, tmp)
+        response.status_code = status.HTTP_202_ACCEPTED
+        job = jobs.runner.submit(
+            "upload_tasks", _upload_tasks_job, current_user.id,
+            project_id=project_id, path=tmp.name, filename=filename
+        )
+        return schemas.JobResponse.model_validate(job)
+
+    try:
+        summary = task_ingest.ingest_tasks(db, project_id, task_ingest.iter_upload(file.file, filename))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not read upload: {e}")
+    progress.refresh_project_stats(db, project_id)
+    db.commit()
+
+    return {"status": "success", **summary}
+
+# ----------------------------------------------------------------
+# JOB ENDPOINTS
+# ----------------------------------------------------------------
+
+@app.get("/jobs/{job_id}", response_model=schemas.JobResponse)
+def get_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: principals.Principal = Depends(get_current_admin)
+):
+    """
+    Status and progress of a background job.
+    """
+    job = db.query(models.Job).filter(models.Job.id == job_id).first()
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.post("/jobs/{job_id}/cancel", response_model=schemas.JobResponse)
+def cancel_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: principals.Principal = Depends(get_current_admin)
+):
+    """
+    Request cancellation of a queued or running job.
+    """
+    job = db.query(models.Job).filter(models.Job.id == job_id).first()
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status in ("queued", "running"):
+        jobs.runner.cancel(job_id)
+        db.refresh(job)
+    return job
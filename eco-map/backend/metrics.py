@@ -0,0 +1,289 @@
+"""
+Request and SQL instrumentation, exposed in the Prometheus text format.
+
+The HTTP middleware times every request by route template. SQLAlchemy cursor
+events time every statement. Statements run while a request is in flight are
+also charged to that request through a context variable, which follows the
+request into threadpool workers and run_sync greenlets. Pool checkouts are
+timed to show how long requests wait for a connection. Statements slower than
+SLOW_QUERY_MS are kept as samples for GET /metrics/slow-queries.
+
+With METRICS_PROFILING enabled, a request sent with `X-Profile: 1` gets its
+query count and DB time back in Server-Timing, one entry per distinct
+statement. The entries include SQL text, so leave profiling off where clients
+are untrusted.
+
+Metrics are per worker process; Prometheus sums them across workers.
+"""
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextvars import ContextVar
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_SAMPLES = int(os.getenv("SLOW_QUERY_SAMPLES", "100"))
+PROFILING_ENABLED = os.getenv("METRICS_PROFILING", "false").lower() in ("1", "true", "yes")
+PROFILE_HEADER = "x-profile"
+# Server-Timing entries in a profiled response
+PROFILE_MAX_STATEMENTS = 20
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+WAIT_BUCKETS = (0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels."""
+
+    def __init__(self, name: str, help: str, buckets, labels=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(labels)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for labels, counts, total, count in sorted(series):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                bucket_labels = _labels(self.label_names + ("le",), labels + (bound,))
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {total}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {count}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_labels(self.label_names, labels)} {value}"
+
+
+REQUEST_SECONDS = Histogram(
+    "ecomap_http_request_duration_seconds", "Request latency by route.", LATENCY_BUCKETS,
+    labels=("method", "route", "status")
+)
+REQUEST_QUERIES = Histogram(
+    "ecomap_http_request_queries", "SQL statements run per request.", COUNT_BUCKETS, labels=("method", "route")
+)
+REQUEST_DB_SECONDS = Histogram(
+    "ecomap_http_request_db_seconds", "Time spent in SQL per request.", LATENCY_BUCKETS, labels=("method", "route")
+)
+QUERY_SECONDS = Histogram("ecomap_db_query_duration_seconds", "SQL statement latency.", QUERY_BUCKETS)
+POOL_WAIT_SECONDS = Histogram(
+    "ecomap_db_pool_checkout_wait_seconds", "Time waiting for a pooled connection.", WAIT_BUCKETS, labels=("pool",)
+)
+SLOW_QUERIES = Counter("ecomap_db_slow_queries_total", f"SQL statements slower than {SLOW_QUERY_MS:g} ms.")
+WRITE_BEHIND_FAILURES = Counter(
+    "ecomap_write_behind_failed_submissions_total", "Buffered submissions that could not be written."
+)
+
+_HISTOGRAMS_AND_COUNTERS = (
+    REQUEST_SECONDS, REQUEST_QUERIES, REQUEST_DB_SECONDS, QUERY_SECONDS, POOL_WAIT_SECONDS, SLOW_QUERIES,
+    WRITE_BEHIND_FAILURES,
+)
+
+_pools = {}
+_slow_queries = deque(maxlen=SLOW_QUERY_SAMPLES)
+
+
+class RequestStats:
+    """SQL charged to one request."""
+
+    __slots__ = ("queries", "db_seconds", "statements")
+
+    def __init__(self, profile: bool = False):
+        self.queries = 0
+        self.db_seconds = 0.0
+        # statement text -> [count, seconds], only when profiling
+        self.statements = {} if profile else None
+
+
+_current = ContextVar("metrics_request", default=None)
+
+
+def _statement_key(statement: str) -> str:
+    return _WHITESPACE.sub(" ", statement).strip()[:200]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["metrics_started"].pop()
+    elapsed = time.perf_counter() - started
+    QUERY_SECONDS.observe(elapsed)
+
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        if stats.statements is not None:
+            entry = stats.statements.setdefault(_statement_key(statement), [0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed
+
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        SLOW_QUERIES.inc()
+        _slow_queries.append({
+            "at": time.time(),
+            "duration_ms": round(elapsed * 1000, 3),
+            "statement": _statement_key(statement),
+        })
+
+
+def _handle_error(context):
+    # The statement failed, so after_cursor_execute will not pop its start time
+    started = context.connection.info.get("metrics_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+class _TimedCheckout:
+    """Times Pool.connect(), which includes waiting for a free slot."""
+    metrics_name = "default"
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            POOL_WAIT_SECONDS.observe(time.perf_counter() - started, self.metrics_name)
+
+
+def timed_pool(pool_class, name: str):
+    """
+    A subclass of pool_class whose checkouts are timed under the given pool
+    label, for create_engine(poolclass=...). The name is kept on the class so
+    it survives the pool being recreated on dispose.
+    """
+    return type(f"Timed{pool_class.__name__}", (_TimedCheckout, pool_class), {"metrics_name": name})
+
+
+def instrument_engine(engine, name: str):
+    """
+    Attach the statement hooks to a (sync) Engine and report its pool;
+    async engines pass .sync_engine. Checkout waits are timed by the pool
+    class, see timed_pool.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    if isinstance(engine.pool, QueuePool):
+        _pools[name] = engine.pool
+
+
+def _server_timing(stats: RequestStats, total_seconds: float) -> str:
+    entries = [
+        f'total;dur={total_seconds * 1000:.3f}',
+        f'db;dur={stats.db_seconds * 1000:.3f};desc="{stats.queries} queries"',
+    ]
+    ranked = sorted(stats.statements.items(), key=lambda item: item[1][1], reverse=True)
+    for index, (statement, (count, seconds)) in enumerate(ranked[:PROFILE_MAX_STATEMENTS]):
+        description = _escape(f"{count}x {statement}")
+        entries.append(f'q{index};dur={seconds * 1000:.3f};desc="{description}"')
+    return ", ".join(entries)
+
+
+async def middleware(request: Request, call_next):
+    profile = PROFILING_ENABLED and request.headers.get(PROFILE_HEADER) == "1"
+    stats = RequestStats(profile)
+    token = _current.set(stats)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - started
+        _current.reset(token)
+        route = request.scope.get("route")
+        # Templates, not raw paths, so ids do not explode the label set
+        path = route.path if route is not None else "unmatched"
+        REQUEST_SECONDS.observe(elapsed, request.method, path, str(status))
+        REQUEST_QUERIES.observe(stats.queries, request.method, path)
+        REQUEST_DB_SECONDS.observe(stats.db_seconds, request.method, path)
+
+    if profile:
+        response.headers["Server-Timing"] = _server_timing(stats, elapsed)
+        response.headers["X-Query-Count"] = str(stats.queries)
+    return response
+
+
+def _pool_gauges():
+    gauges = (
+        ("ecomap_db_pool_size", "Configured pool size.", lambda pool: pool.size()),
+        ("ecomap_db_pool_checked_out", "Connections currently in use.", lambda pool: pool.checkedout()),
+        ("ecomap_db_pool_overflow", "Connections open beyond the pool size.", lambda pool: max(pool.overflow(), 0)),
+    )
+    for name, help, read in gauges:
+        yield f"# HELP {name} {help}"
+        yield f"# TYPE {name} gauge"
+        for pool_name, pool in sorted(_pools.items()):
+            yield f"{name}{_labels(('pool',), (pool_name,))} {read(pool)}"
+
+
+def render() -> str:
+    lines = []
+    for metric in _HISTOGRAMS_AND_COUNTERS:
+        lines.extend(metric.render())
+    lines.extend(_pool_gauges())
+    return "\n".join(lines) + "\n"
+
+
+def slow_queries():
+    """Most recent slow statements, newest first."""
+    return list(reversed(_slow_queries))
@@ -0,0 +1,82 @@
+"""Baseline: users, projects, subdivisions and annotations
+
+The schema as create_all used to build it. Every step uses IF NOT EXISTS, so
+databases created by create_all before migrations existed upgrade in place.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from geoalchemy2 import Geometry
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS postgis")
+
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("username", sa.String()),
+        sa.Column("hashed_password", sa.String()),
+        sa.Column("is_admin", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("score", sa.Integer()),
+        if_not_exists=True,
+    )
+    op.create_index("ix_users_id", "users", ["id"], if_not_exists=True)
+    op.create_index("ix_users_username", "users", ["username"], unique=True, if_not_exists=True)
+
+    # Spatial indexes are created explicitly in 0004
+    op.create_table(
+        "projects",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String()),
+        sa.Column("description", sa.String()),
+        sa.Column("nasa_layer_id", sa.String()),
+        sa.Column("date_target", sa.DateTime()),
+        sa.Column("boundary_geom", Geometry("POLYGON", srid=4326, spatial_index=False)),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("required_annotations", sa.Integer()),
+        if_not_exists=True,
+    )
+    op.create_index("ix_projects_id", "projects", ["id"], if_not_exists=True)
+    op.create_index("ix_projects_name", "projects", ["name"], if_not_exists=True)
+
+    op.create_table(
+        "subdivisions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id")),
+        sa.Column("geom", Geometry("POLYGON", srid=4326, spatial_index=False)),
+        sa.Column("completion_count", sa.Integer()),
+        if_not_exists=True,
+    )
+    op.create_index("ix_subdivisions_id", "subdivisions", ["id"], if_not_exists=True)
+
+    op.create_table(
+        "annotations",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id")),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("subdivision_id", sa.Integer(), sa.ForeignKey("subdivisions.id")),
+        sa.Column("label_type", sa.String()),
+        sa.Column("quality_score", sa.Integer()),
+        sa.Column("geom", Geometry("POINT", srid=4326, spatial_index=False)),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        if_not_exists=True,
+    )
+    op.create_index("ix_annotations_id", "annotations", ["id"], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_table("annotations")
+    op.drop_table("subdivisions")
+    op.drop_table("projects")
+    op.drop_table("users")
@@ -0,0 +1,121 @@
+"""Task submissions, progress counters, task leases and jobs
+
+Existing annotations are backfilled into task_submissions and
+project_user_stats, so upgraded databases dedupe and list past work.
+
+Revision ID: 0002_workflow_tables
+Revises: 0001_baseline
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision = "0002_workflow_tables"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+BACKFILL_SUBMISSIONS = """
+    INSERT INTO task_submissions (project_id, subdivision_id, user_id)
+    SELECT DISTINCT project_id, subdivision_id, user_id
+    FROM annotations
+    WHERE project_id IS NOT NULL AND subdivision_id IS NOT NULL AND user_id IS NOT NULL
+    ON CONFLICT DO NOTHING
+"""
+
+BACKFILL_USER_STATS = """
+    INSERT INTO project_user_stats (project_id, user_id, subdivisions_completed, annotation_count)
+    SELECT project_id, user_id, count(DISTINCT subdivision_id), count(*)
+    FROM annotations
+    WHERE project_id IS NOT NULL AND user_id IS NOT NULL
+    GROUP BY project_id, user_id
+    ON CONFLICT DO NOTHING
+"""
+
+
+def upgrade():
+    op.create_table(
+        "task_submissions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id")),
+        sa.Column("subdivision_id", sa.Integer(), sa.ForeignKey("subdivisions.id")),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.UniqueConstraint("project_id", "subdivision_id", "user_id", name="uq_task_submissions_task_user"),
+        if_not_exists=True,
+    )
+    op.create_index("ix_task_submissions_id", "task_submissions", ["id"], if_not_exists=True)
+
+    op.create_table(
+        "project_stats",
+        sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id"), primary_key=True),
+        sa.Column("completion_threshold", sa.Integer()),
+        sa.Column("total_subtasks", sa.Integer()),
+        sa.Column("completed_subtasks", sa.Integer()),
+        sa.Column("zero_completed_subtasks", sa.Integer()),
+        sa.Column("completion_sum", sa.BigInteger()),
+        sa.Column("version", sa.BigInteger(), nullable=False, server_default="0"),
+        if_not_exists=True,
+    )
+    # project_stats predates the version counter on some databases
+    op.add_column(
+        "project_stats",
+        sa.Column("version", sa.BigInteger(), nullable=False, server_default="0"),
+        if_not_exists=True,
+    )
+
+    op.create_table(
+        "project_user_stats",
+        sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id"), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("subdivisions_completed", sa.Integer()),
+        sa.Column("annotation_count", sa.Integer()),
+        if_not_exists=True,
+    )
+
+    op.create_table(
+        "task_leases",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id")),
+        sa.Column("subdivision_id", sa.Integer(), sa.ForeignKey("subdivisions.id"), unique=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("expires_at", sa.DateTime(timezone=True)),
+        if_not_exists=True,
+    )
+    op.create_index("ix_task_leases_id", "task_leases", ["id"], if_not_exists=True)
+    op.create_index("ix_task_leases_project_id", "task_leases", ["project_id"], if_not_exists=True)
+    op.create_index("ix_task_leases_user_id", "task_leases", ["user_id"], if_not_exists=True)
+    op.create_index("ix_task_leases_expires_at", "task_leases", ["expires_at"], if_not_exists=True)
+
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("kind", sa.String()),
+        sa.Column("status", sa.String()),
+        sa.Column("progress", sa.Integer()),
+        sa.Column("total", sa.Integer()),
+        sa.Column("result", JSONB()),
+        sa.Column("error", sa.String()),
+        sa.Column("cancel_requested", sa.Boolean()),
+        sa.Column("created_by", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        if_not_exists=True,
+    )
+    op.create_index("ix_jobs_id", "jobs", ["id"], if_not_exists=True)
+    op.create_index("ix_jobs_status", "jobs", ["status"], if_not_exists=True)
+
+    # Annotations written before these tables existed are finished tasks too. The
+    # submission write path and task assignment dedupe on task_submissions, and
+    # "my projects" reads project_user_stats, so fill both now rather than lazily.
+    op.execute(BACKFILL_SUBMISSIONS)
+    op.execute(BACKFILL_USER_STATS)
+
+
+def downgrade():
+    op.drop_table("jobs")
+    op.drop_table("task_leases")
+    op.drop_table("project_user_stats")
+    op.drop_table("project_stats")
+    op.drop_table("task_submissions")
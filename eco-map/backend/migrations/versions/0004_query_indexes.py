@@ -0,0 +1,51 @@
+"""Indexes for the hot queries and GiST indexes on every geometry
+
+Nearly every endpoint filters annotations and subdivisions by project, user
+or subdivision, and map queries test geometries against envelopes. The
+indexes are built CONCURRENTLY so the tables stay writable on a live
+database.
+
+Revision ID: 0004_query_indexes
+Revises: 0003_annotation_label_columns
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0004_query_indexes"
+down_revision = "0003_annotation_label_columns"
+branch_labels = None
+depends_on = None
+
+# (name, table, columns, index method)
+INDEXES = [
+    # Duplicate checks, per-user counters and submissions by task
+    ("ix_annotations_project_user_subdivision", "annotations", ["project_id", "user_id", "subdivision_id"], None),
+    # Keyset pages of a project's annotations
+    ("ix_annotations_project_id", "annotations", ["project_id", "id"], None),
+    ("ix_annotations_user_id", "annotations", ["user_id"], None),
+    ("ix_annotations_subdivision_id", "annotations", ["subdivision_id"], None),
+    # Task assignment seeks by completion tier, then by id within the tier
+    ("ix_subdivisions_project_completion", "subdivisions", ["project_id", "completion_count", "id"], None),
+    # Keyset pages of a project's grid
+    ("ix_subdivisions_project_id", "subdivisions", ["project_id", "id"], None),
+    ("ix_project_user_stats_user", "project_user_stats", ["user_id", "project_id"], None),
+    ("idx_projects_boundary_geom", "projects", ["boundary_geom"], "gist"),
+    ("idx_subdivisions_geom", "subdivisions", ["geom"], "gist"),
+    ("idx_annotations_geom", "annotations", ["geom"], "gist"),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, using in INDEXES:
+            op.create_index(
+                name, table, columns,
+                postgresql_using=using, postgresql_concurrently=True, if_not_exists=True
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
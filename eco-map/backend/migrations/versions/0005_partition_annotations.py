@@ -0,0 +1,108 @@
+"""Partition annotations by project
+
+annotations is rebuilt as a LIST partitioned table on project_id. There is
+one partition per existing project and a default partition for rows whose
+project has none yet; new projects get theirs from partitions.create. The
+primary key becomes (project_id, id), since a partitioned table's unique
+keys must include the partition key. It also serves the keyset pages that
+ix_annotations_project_id used to serve. Rows without a project_id cannot
+be routed and are kept in annotations_orphaned.
+
+The rows are copied in one statement and the table is locked while that
+runs, so upgrade large databases in a maintenance window.
+
+Revision ID: 0005_partition_annotations
+Revises: 0004_query_indexes
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_partition_annotations"
+down_revision = "0004_query_indexes"
+branch_labels = None
+depends_on = None
+
+SEQUENCE = "annotations_id_seq"
+
+FOREIGN_KEYS = [
+    ("annotations_project_id_fkey", "projects", "project_id"),
+    ("annotations_user_id_fkey", "users", "user_id"),
+    ("annotations_subdivision_id_fkey", "subdivisions", "subdivision_id"),
+]
+
+# (name, columns, index method)
+INDEXES = [
+    ("ix_annotations_id", ["id"], None),
+    ("ix_annotations_user_id", ["user_id"], None),
+    ("ix_annotations_subdivision_id", ["subdivision_id"], None),
+    ("ix_annotations_project_user_subdivision", ["project_id", "user_id", "subdivision_id"], None),
+    ("ix_annotations_project_category", ["project_id", "label_category"], None),
+    ("ix_annotations_project_magnitude", ["project_id", "magnitude"], None),
+    ("idx_annotations_geom", ["geom"], "gist"),
+]
+
+CREATE_PROJECT_PARTITIONS = """
+    DO $$
+    DECLARE project_id integer;
+    BEGIN
+        FOR project_id IN SELECT id FROM projects LOOP
+            EXECUTE format(
+                'CREATE TABLE annotations_p%s PARTITION OF annotations_new FOR VALUES IN (%s)',
+                project_id, project_id
+            );
+        END LOOP;
+    END $$
+"""
+
+KEEP_ORPHANS = """
+    DO $$
+    BEGIN
+        IF EXISTS (SELECT 1 FROM annotations WHERE project_id IS NULL) THEN
+            CREATE TABLE annotations_orphaned AS SELECT * FROM annotations WHERE project_id IS NULL;
+        END IF;
+    END $$
+"""
+
+
+def _is_partitioned() -> bool:
+    return op.get_bind().scalar(sa.text(
+        "SELECT relkind = 'p' FROM pg_class WHERE oid = 'annotations'::regclass"
+    ))
+
+
+def _swap_in(primary_key, indexes):
+    """Replace annotations with annotations_new and give it keys and indexes."""
+    # The id sequence belongs to the old table and would be dropped with it
+    op.execute(f"ALTER SEQUENCE {SEQUENCE} OWNED BY NONE")
+    op.execute("DROP TABLE annotations CASCADE")
+    op.execute("ALTER TABLE annotations_new RENAME TO annotations")
+    op.execute(f"ALTER SEQUENCE {SEQUENCE} OWNED BY annotations.id")
+    op.create_primary_key("annotations_pkey", "annotations", primary_key)
+    for name, referent, column in FOREIGN_KEYS:
+        op.create_foreign_key(name, "annotations", referent, [column], ["id"])
+    for name, columns, using in indexes:
+        op.create_index(name, "annotations", columns, postgresql_using=using)
+    op.execute("ANALYZE annotations")
+
+
+def upgrade():
+    if not op.get_context().as_sql and _is_partitioned():
+        return
+
+    op.execute("CREATE TABLE annotations_new (LIKE annotations INCLUDING DEFAULTS) PARTITION BY LIST (project_id)")
+    op.execute("CREATE TABLE annotations_default PARTITION OF annotations_new DEFAULT")
+    op.execute(CREATE_PROJECT_PARTITIONS)
+    op.execute("INSERT INTO annotations_new SELECT * FROM annotations WHERE project_id IS NOT NULL")
+    op.execute(KEEP_ORPHANS)
+    _swap_in(["project_id", "id"], INDEXES)
+
+
+def downgrade():
+    if not op.get_context().as_sql and not _is_partitioned():
+        return
+
+    op.execute("CREATE TABLE annotations_new (LIKE annotations INCLUDING DEFAULTS)")
+    op.execute("INSERT INTO annotations_new SELECT * FROM annotations")
+    op.execute("ALTER TABLE annotations_new ALTER COLUMN project_id DROP NOT NULL")
+    _swap_in(["id"], INDEXES + [("ix_annotations_project_id", ["project_id", "id"], None)])
@@ -1,5 +1,9 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Float
+from sqlalchemy import (
+    Column, Integer, BigInteger, String, Boolean, ForeignKey, DateTime, Float, Index, PrimaryKeyConstraint,
+    UniqueConstraint
+)
 from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from geoalchemy2 import Geometry
 from database import Base
@@ -32,8 +36,12 @@ class Project(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     is_active = Column(Boolean, default=True) 
     required_annotations = Column(Integer, default=100) 
-    annotations = relationship("Annotation", back_populates="project", cascade="all, delete-orphan")
+    # Annotations are removed with their partition (see partitions.py), never row by row
+    annotations = relationship("Annotation", back_populates="project", passive_deletes="all")
     subdivisions = relationship("Subdivision", back_populates="project", cascade="all, delete-orphan")
+    stats = relationship("ProjectStats", back_populates="project", uselist=False, cascade="all, delete-orphan")
+    user_stats = relationship("ProjectUserStats", cascade="all, delete-orphan")
+    submissions = relationship("TaskSubmission", cascade="all, delete-orphan")
 
 class Subdivision(Base):
     """
@@ -46,19 +54,119 @@ class Subdivision(Base):
     completion_count = Column(Integer, default=0)
     project = relationship("Project", back_populates="subdivisions")
     annotations = relationship("Annotation", back_populates="subdivision")
+
+    __table_args__ = (
+        # Task assignment seeks by completion tier, then by id within the tier
+        Index("ix_subdivisions_project_completion", "project_id", "completion_count", "id"),
+        # Keyset pages of a project's grid
+        Index("ix_subdivisions_project_id", "project_id", "id"),
+    )
+
 class Annotation(Base):
     '''
-    Annotations made by users on project subdivisions.
+    Annotations made by users on project subdivisions, partitioned by project.
     '''
     __tablename__ = "annotations"
-    id = Column(Integer, primary_key=True, index=True)
-    project_id = Column(Integer, ForeignKey("projects.id"))
-    user_id = Column(Integer, ForeignKey("users.id"))
-    subdivision_id = Column(Integer, ForeignKey("subdivisions.id"))
+    id = Column(Integer, autoincrement=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    subdivision_id = Column(Integer, ForeignKey("subdivisions.id"), index=True)
     label_type = Column(String)
+    # Parsed from label_type on write (see labels.py)
+    label_category = Column(String)
+    magnitude = Column(Integer)
     quality_score = Column(Integer, default=0)
     geom = Column(Geometry('POINT', srid=4326))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     project = relationship("Project", back_populates="annotations")
     user = relationship("User", back_populates="annotations")
-    subdivision = relationship("Subdivision", back_populates="annotations") 
\ No newline at end of file
+    subdivision = relationship("Subdivision", back_populates="annotations")
+
+    __table_args__ = (
+        # Unique keys of a partitioned table must include the partition key; this one
+        # also serves keyset pages of a project's annotations
+        PrimaryKeyConstraint("project_id", "id", name="annotations_pkey"),
+        Index("ix_annotations_project_user_subdivision", "project_id", "user_id", "subdivision_id"),
+        Index("ix_annotations_project_category", "project_id", "label_category"),
+        Index("ix_annotations_project_magnitude", "project_id", "magnitude"),
+        {"postgresql_partition_by": "LIST (project_id)"},
+    )
+
+
+class TaskSubmission(Base):
+    """
+    One finished task: a user submitted their annotations for a subdivision.
+    The unique constraint makes a second submission for the same task a no-op.
+    """
+    __tablename__ = "task_submissions"
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"))
+    subdivision_id = Column(Integer, ForeignKey("subdivisions.id"))
+    user_id = Column(Integer, ForeignKey("users.id"))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("project_id", "subdivision_id", "user_id", name="uq_task_submissions_task_user"),
+    )
+
+
+class ProjectStats(Base):
+    """
+    Cached progress counters for a project, kept current by the annotation write path.
+    """
+    __tablename__ = "project_stats"
+    project_id = Column(Integer, ForeignKey("projects.id"), primary_key=True)
+    completion_threshold = Column(Integer, default=10)
+    total_subtasks = Column(Integer, default=0)
+    completed_subtasks = Column(Integer, default=0)
+    zero_completed_subtasks = Column(Integer, default=0)
+    completion_sum = Column(BigInteger, default=0)
+    # Bumped whenever the grid or its annotations change; keys derived caches
+    version = Column(BigInteger, default=0, nullable=False)
+    project = relationship("Project", back_populates="stats")
+
+
+class ProjectUserStats(Base):
+    """
+    Per-user contribution counters for a project.
+    """
+    __tablename__ = "project_user_stats"
+    project_id = Column(Integer, ForeignKey("projects.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    subdivisions_completed = Column(Integer, default=0)
+    annotation_count = Column(Integer, default=0)
+
+    __table_args__ = (
+        # "My projects" looks rows up by user
+        Index("ix_project_user_stats_user", "user_id", "project_id"),
+    )
+
+
+class TaskLease(Base):
+    """
+    Time-limited reservation of a subdivision for one reviewer.
+    """
+    __tablename__ = "task_leases"
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), index=True)
+    subdivision_id = Column(Integer, ForeignKey("subdivisions.id"), unique=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    expires_at = Column(DateTime(timezone=True), index=True)
+
+
+class Job(Base):
+    """
+    Long-running admin operation executed by the in-process job runner.
+    """
+    __tablename__ = "jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String)
+    status = Column(String, default="queued", index=True)
+    progress = Column(Integer, default=0)
+    total = Column(Integer)
+    result = Column(JSONB)
+    error = Column(String)
+    cancel_requested = Column(Boolean, default=False)
+    created_by = Column(Integer, ForeignKey("users.id"))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
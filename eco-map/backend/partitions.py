@@ -0,0 +1,78 @@
+"""
+Per-project partitions of the annotations table.
+
+annotations is LIST partitioned on project_id (migration 0005). Every project
+gets its own partition, annotations_p<id>, when it is created. Rows for a
+project without one land in annotations_default, so writes never fail for a
+missing partition. Queries filter on annotations.project_id, which lets
+PostgreSQL prune the scan to one partition whatever the global volume.
+
+Removing a project's annotations is a single DROP of its partition instead of
+a row-by-row delete. detach() takes the partition out of the table and keeps
+it as a standalone archive table.
+"""
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+DEFAULT_PARTITION = "annotations_default"
+
+
+def partition_name(project_id: int) -> str:
+    return f"annotations_p{int(project_id)}"
+
+
+def archive_name(project_id: int) -> str:
+    return f"archived_annotations_p{int(project_id)}"
+
+
+def exists(db: Session, name: str) -> bool:
+    return db.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name})
+
+
+def create(db: Session, project_id: int):
+    """
+    Give the project its own partition, moving in any of its rows that were
+    written to the default partition. Does nothing if it exists. The caller commits.
+    """
+    name = partition_name(project_id)
+    if exists(db, name):
+        return
+    # Filled before it is attached, so the attach only has to check the default partition
+    db.execute(text(f"CREATE TABLE {name} (LIKE annotations)"))
+    db.execute(text(f"""
+        WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE project_id = :project_id RETURNING *)
+        INSERT INTO {name} SELECT * FROM moved
+    """), {"project_id": project_id})
+    db.execute(text(f"ALTER TABLE annotations ATTACH PARTITION {name} FOR VALUES IN ({int(project_id)})"))
+
+
+def drop(db: Session, project_id: int):
+    """Delete all of the project's annotations. The caller commits."""
+    db.execute(text(f"DROP TABLE IF EXISTS {partition_name(project_id)}"))
+    # Only the default partition can still hold rows for the project
+    db.execute(text("DELETE FROM annotations WHERE project_id = :project_id"), {"project_id": project_id})
+
+
+def detach(db: Session, project_id: int) -> str:
+    """
+    Move the project's annotations out of the table into a standalone archive
+    table, returning its name. The archive keeps no foreign keys, so the
+    project, its grid and its users can be deleted afterwards. The caller commits.
+    """
+    create(db, project_id)
+    name = partition_name(project_id)
+    archived = archive_name(project_id)
+    db.execute(text(f"ALTER TABLE annotations DETACH PARTITION {name}"))
+    db.execute(text(f"ALTER TABLE {name} RENAME TO {archived}"))
+    db.execute(text(f"""
+        DO $$
+        DECLARE constraint_name text;
+        BEGIN
+            FOR constraint_name IN
+                SELECT conname FROM pg_constraint WHERE conrelid = '{archived}'::regclass AND contype = 'f'
+            LOOP
+                EXECUTE format('ALTER TABLE {archived} DROP CONSTRAINT %I', constraint_name);
+            END LOOP;
+        END $$
+    """))
+    return archived
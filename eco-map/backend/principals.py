@@ -0,0 +1,62 @@
+"""
+Authenticated principals.
+
+Access tokens carry the user id ("uid") next to the username, so resolving
+a request's user is a primary-key lookup at most. The admin flag is always
+read from the users table, never from the token. Resolved principals are
+kept in a short-TTL LRU cache, which means most requests authenticate
+without touching the database; the TTL bounds how long a changed username
+or admin flag can be served stale.
+"""
+import os
+from typing import NamedTuple, Optional
+
+from sqlalchemy.orm import Session
+
+from cache import LRUCache
+import models
+
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+
+
+class Principal(NamedTuple):
+    id: int
+    username: str
+    is_admin: bool
+
+
+_principals = LRUCache(PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL)
+
+
+def token_claims(user: models.User):
+    return {"sub": user.username, "uid": user.id}
+
+
+def resolve(db: Session, payload: dict) -> Optional[Principal]:
+    """
+    Principal for a decoded token payload, or None if the user no longer
+    exists or no longer matches the token. Tokens issued before the uid claim
+    existed are resolved by username.
+    """
+    username = payload.get("sub")
+    user_id = payload.get("uid")
+    if username is None:
+        return None
+
+    principal = _principals.get(user_id) if user_id is not None else None
+    if principal is None:
+        query = db.query(models.User.id, models.User.username, models.User.is_admin)
+        if user_id is not None:
+            row = query.filter(models.User.id == user_id).first()
+        else:
+            row = query.filter(models.User.username == username).first()
+        if row is None:
+            return None
+        principal = Principal(row.id, row.username, bool(row.is_admin))
+        _principals.set(principal.id, principal)
+
+    # A renamed user's old tokens stop working, as they did with username lookups
+    if principal.username != username:
+        return None
+    return principal
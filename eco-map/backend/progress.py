@@ -0,0 +1,123 @@
+"""
+Project progress counters.
+
+get_project_progress is called after every submission, so instead of counting
+the grid on each call the numbers live in project_stats / project_user_stats
+and are adjusted in place by the submission write path (see submissions.py).
+refresh_project_stats rebuilds them with a single aggregate pass when the grid
+changes or the counters are missing. Both paths bump project_stats.version,
+which keys caches of derived data such as map tiles and HTTP responses;
+edits to the project row itself call bump_version.
+"""
+from sqlalchemy import func, exists
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+import models
+
+DEFAULT_COMPLETION_THRESHOLD = 10
+
+
+def refresh_project_stats(db: Session, project_id: int, completion_threshold: int = None,
+                          include_users: bool = False):
+    """
+    Recompute the project counters from the grid, creating the row if needed.
+    With include_users, or when the row did not exist yet, the per-user counters
+    are rebuilt from annotations too. The row stays locked (FOR UPDATE) until
+    the caller commits, so refreshes and submissions queue behind each other.
+    """
+    # Concurrent first requests may all get here; only one creates the row
+    created = db.execute(
+        insert(models.ProjectStats).values(
+            project_id=project_id,
+            completion_threshold=(
+                DEFAULT_COMPLETION_THRESHOLD if completion_threshold is None else completion_threshold
+            ),
+            total_subtasks=0,
+            completed_subtasks=0,
+            zero_completed_subtasks=0,
+            completion_sum=0,
+            version=0,
+        ).on_conflict_do_nothing().returning(models.ProjectStats.project_id)
+    ).first() is not None
+    if created:
+        include_users = True
+
+    # Submissions update this row too; holding its lock until the caller commits
+    # keeps their increments from landing between the aggregate and the write below
+    stats = db.query(models.ProjectStats).filter(
+        models.ProjectStats.project_id == project_id
+    ).with_for_update().populate_existing().one()
+    if completion_threshold is not None:
+        stats.completion_threshold = completion_threshold
+
+    threshold = stats.completion_threshold
+    sub = models.Subdivision
+    total, completed, zero, completion_sum = db.query(
+        func.count(sub.id),
+        func.count(sub.id).filter(sub.completion_count >= threshold),
+        func.count(sub.id).filter(sub.completion_count == 0),
+        func.coalesce(func.sum(sub.completion_count), 0),
+    ).filter(sub.project_id == project_id).one()
+
+    stats.total_subtasks = total
+    stats.completed_subtasks = completed
+    stats.zero_completed_subtasks = zero
+    stats.completion_sum = completion_sum
+    # Bumped in SQL like the submission path does, never from a value read earlier
+    stats.version = models.ProjectStats.version + 1
+
+    if include_users:
+        ann = models.Annotation
+
+        # Annotations written before task_submissions existed still count as finished tasks
+        finished = db.query(ann.project_id, ann.subdivision_id, ann.user_id).filter(
+            ann.project_id == project_id
+        ).distinct()
+        db.execute(insert(models.TaskSubmission).from_select(
+            ["project_id", "subdivision_id", "user_id"], finished
+        ).on_conflict_do_nothing())
+
+        per_user = db.query(
+            ann.project_id,
+            ann.user_id,
+            func.count(func.distinct(ann.subdivision_id)),
+            func.count(ann.id),
+        ).filter(ann.project_id == project_id).group_by(ann.project_id, ann.user_id)
+        stmt = insert(models.ProjectUserStats).from_select(
+            ["project_id", "user_id", "subdivisions_completed", "annotation_count"], per_user
+        )
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["project_id", "user_id"],
+            set_={
+                "subdivisions_completed": stmt.excluded.subdivisions_completed,
+                "annotation_count": stmt.excluded.annotation_count,
+            },
+        ))
+
+    db.flush()
+    return stats
+
+
+def bump_version(db: Session, project_id: int):
+    """Mark the project's data as changed. The caller commits."""
+    updated = db.query(models.ProjectStats).filter(
+        models.ProjectStats.project_id == project_id
+    ).update({models.ProjectStats.version: models.ProjectStats.version + 1}, synchronize_session=False)
+    if not updated:
+        refresh_project_stats(db, project_id, include_users=True)
+
+
+def project_version(db: Session, project_id: int):
+    """
+    Current data version of the project, or None if the project does not
+    exist. Creates the counters row on first use; the caller commits.
+    """
+    version = db.query(models.ProjectStats.version).filter(
+        models.ProjectStats.project_id == project_id
+    ).scalar()
+    if version is None:
+        if not db.query(exists().where(models.Project.id == project_id)).scalar():
+            return None
+        version = refresh_project_stats(db, project_id, include_users=True).version
+    return version
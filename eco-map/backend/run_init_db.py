@@ -1,7 +1,20 @@
 # run_init_db.py
-from database import engine
-from models import Base
+"""
+Bring the database schema up to date; the same as `alembic upgrade head`
+run from this directory.
+"""
+import os
+
+from alembic import command
+from alembic.config import Config
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+
+
+def upgrade(revision: str = "head"):
+    command.upgrade(Config(ALEMBIC_INI), revision)
+
 
 if __name__ == "__main__":
-    Base.metadata.create_all(bind=engine)
-    print("Tables created successfully.")
\ No newline at end of file
+    upgrade()
+    print("Database migrated successfully.")
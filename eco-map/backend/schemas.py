@@ -1,12 +1,16 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from datetime import datetime
-from typing import Optional, Any, Dict, List
+from typing import Optional, Any, Dict, List, Union
 
 # ======== Token Schemas =======
 class Token(BaseModel):
     access_token: str
     token_type: str
 
+class StreamToken(BaseModel):
+    token: str
+    expires_in: int
+
 class TokenData(BaseModel):
     username: Optional[str] = None
 
@@ -35,10 +39,12 @@ class ProjectBase(BaseModel):
 class ProjectCreate(ProjectBase):
     boundary_geom: str 
     date_target: datetime
+    completion_threshold: int = Field(10, ge=1)
 
 class ProjectUpdate(BaseModel):
     description: Optional[str] = None
     is_active: Optional[bool] = None
+    completion_threshold: Optional[int] = Field(None, ge=1)
 
 class ProjectResponse(ProjectBase):
     id: int
@@ -65,9 +71,24 @@ class ProjectProgressResponse(BaseModel):
 
 
 # ======= Subdivision Schemas =======
+# Bounds on generated grids; every cell is built in memory before it is inserted
+MAX_GRID_SIDE = 5000
+MAX_GRID_CELLS = 1_000_000
+
 class GridRequest(BaseModel):
-    rows: int
-    cols: int
+    rows: int = Field(ge=1, le=MAX_GRID_SIDE)
+    cols: int = Field(ge=1, le=MAX_GRID_SIDE)
+    clip: bool = False
+
+    @model_validator(mode="after")
+    def check_cell_count(self):
+        if self.rows * self.cols > MAX_GRID_CELLS:
+            raise ValueError(f"rows * cols must be at most {MAX_GRID_CELLS}")
+        return self
+
+class GridSummaryResponse(BaseModel):
+    project_id: int
+    subdivisions_created: int
 
 class SubdivisionResponse(BaseModel):
     id: int
@@ -79,6 +100,12 @@ class SubdivisionResponse(BaseModel):
         from_attributes = True
 
 
+class TaskLeaseResponse(BaseModel):
+    project_id: int
+    expires_at: datetime
+    tasks: List[SubdivisionResponse]
+
+
 # ======= Annotation Schemas =======
 class AnnotationBase(BaseModel):
     label_type: str  
@@ -106,15 +133,47 @@ class AnnotationResponse(BaseModel):
     subdivision_id: int 
     user_id: int
     label_type: Optional[str] = None
+    label_category: Optional[str] = None
+    magnitude: Optional[int] = None
     geometry: Optional[Dict[str, Any]] = None
     created_at: datetime
 
     class Config:
         from_attributes = True
 
+class HeatmapResponse(BaseModel):
+    project_id: int
+    shape: str
+    cell_size: float
+    bbox: List[float]
+    # Parallel per-bin arrays: bin centre and count / sum / max magnitude
+    x: List[float]
+    y: List[float]
+    count: List[int]
+    sum: List[int]
+    max: List[int]
+    max_magnitude: int
+
 # ======= Task Schemas =======
 class TaskItem(BaseModel):
-    geom: str  
+    # WKT string or GeoJSON geometry
+    geom: Union[str, Dict[str, Any]]
 
 class TaskList(BaseModel):
-    tasks: List[TaskItem]
\ No newline at end of file
+    tasks: List[TaskItem]
+
+
+# ======= Job Schemas =======
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: str
+    progress: int = 0
+    total: Optional[int] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -13,6 +13,10 @@ if not SECRET_KEY:
     raise RuntimeError("JWT_SECRET_KEY is not set")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Tokens for a project's event stream: only checked when the stream opens,
+# so they can be short-lived, and they are valid for nothing else
+STREAM_TOKEN_SCOPE = "events"
+STREAM_TOKEN_EXPIRE_SECONDS = 60
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
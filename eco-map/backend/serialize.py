@@ -0,0 +1,86 @@
+"""
+Fast JSON responses for rows with geometry.
+
+List endpoints select plain columns plus a "geometry" column rendered by
+PostGIS with ST_AsGeoJSON. The GeoJSON text is spliced into the response as
+raw JSON with orjson.Fragment. Nothing is converted through shapely, no dicts
+are built per coordinate, and pydantic does not validate each row again. The
+endpoints keep their response_model so the API docs do not change.
+"""
+import os
+
+import orjson
+from fastapi.responses import Response
+from sqlalchemy import func
+
+import models
+
+# Decimal places in GeoJSON coordinates (7 is about 1 cm)
+GEOJSON_PRECISION = int(os.getenv("GEOJSON_PRECISION", "7"))
+
+PROJECT_COLUMNS = (
+    models.Project.id,
+    models.Project.name,
+    models.Project.description,
+    models.Project.nasa_layer_id,
+    models.Project.created_at,
+    models.Project.is_active,
+)
+
+# Names accepted by fields= on the list endpoints
+PROJECT_FIELDS = tuple(column.key for column in PROJECT_COLUMNS) + ("geometry",)
+SUBDIVISION_FIELDS = ("id", "project_id", "completion_count", "geometry")
+
+_FROM_ROW = object()
+
+
+class RawJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+def geojson(column, label: str = "geometry"):
+    """The column rendered as GeoJSON text by PostGIS."""
+    return func.ST_AsGeoJSON(column, GEOJSON_PRECISION).label(label)
+
+
+def parse_fields(fields: str, available) -> tuple:
+    """
+    The names in a comma separated fields= value, in `available` order, or all
+    of `available` when fields is None. id is always kept because it is the
+    page cursor. Raises ValueError on unknown names.
+    """
+    if fields is None:
+        return tuple(available)
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = names.difference(available)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}. Use any of: {', '.join(available)}")
+    names.add("id")
+    return tuple(name for name in available if name in names)
+
+
+def row_dict(row, geometry=_FROM_ROW):
+    """
+    A result row as a dict, with its geometry text (or the one passed in)
+    embedded as raw JSON.
+    """
+    data = dict(row._mapping)
+    if geometry is _FROM_ROW:
+        if "geometry" not in data:
+            return data
+        geometry = data["geometry"]
+    data["geometry"] = orjson.Fragment(geometry) if geometry is not None else None
+    return data
+
+
+def rows_response(rows, geometries: dict = None, status_code: int = 200):
+    """
+    JSON list of rows. geometries optionally maps row ids to GeoJSON text
+    selected separately from the rows.
+    """
+    if geometries is not None:
+        return RawJSONResponse([row_dict(row, geometries.get(row.id)) for row in rows], status_code=status_code)
+    return RawJSONResponse([row_dict(row) for row in rows], status_code=status_code)
@@ -0,0 +1,208 @@
+"""
+Annotation submission write path.
+
+A submission is one user finishing one subdivision with a list of annotation
+points. Recording it takes two statements, with no read-modify-write in
+Python:
+
+1. A single CTE claims the task in task_submissions with ON CONFLICT DO NOTHING
+   (the unique constraint, plus an indexed probe of the user's annotations for
+   the cell, replaces the old "already completed" pre-check),
+   bumps completion_count with an atomic UPDATE ... RETURNING, adjusts the
+   cached progress counters (and the project version) and drops the user's
+   lease on the cell. The new counts are staged for live.py, which pushes
+   them to subscribed clients once the transaction commits.
+2. A multi-row INSERT writes the annotations of the accepted submissions.
+
+Several submissions can be recorded at once; row locks are taken in the same
+order (subdivisions, then project_stats) for every caller.
+"""
+from typing import List, NamedTuple, Tuple
+
+from geoalchemy2.elements import WKTElement
+from sqlalchemy import text, insert, bindparam, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+
+import live
+import models
+from labels import parse_label
+
+
+class Submission(NamedTuple):
+    project_id: int
+    subdivision_id: int
+    user_id: int
+    # (WKT point, label_type) pairs
+    annotations: List[Tuple[str, str]]
+
+
+class SubmissionResult(NamedTuple):
+    completion_count: int
+    # (id, created_at) of the inserted annotations, in submission order
+    annotations: list
+
+
+_CLAIM_TASKS = text("""
+    WITH incoming AS (
+        -- The first copy wins when the same task is submitted twice in one call
+        SELECT DISTINCT ON (project_id, subdivision_id, user_id)
+               project_id, subdivision_id, user_id, annotation_count
+        FROM unnest(CAST(:project_ids AS integer[]), CAST(:subdivision_ids AS integer[]),
+                    CAST(:user_ids AS integer[]), CAST(:annotation_counts AS integer[]))
+            WITH ORDINALITY AS t(project_id, subdivision_id, user_id, annotation_count, ord)
+        ORDER BY project_id, subdivision_id, user_id, ord
+    ),
+    accepted AS (
+        INSERT INTO task_submissions (project_id, subdivision_id, user_id)
+        SELECT i.project_id, i.subdivision_id, i.user_id
+        FROM incoming i
+        JOIN subdivisions s ON s.id = i.subdivision_id AND s.project_id = i.project_id
+        -- Annotations missing from task_submissions (e.g. written outside this path) still count
+        WHERE NOT EXISTS (
+            SELECT 1 FROM annotations a
+            WHERE a.project_id = i.project_id AND a.user_id = i.user_id AND a.subdivision_id = i.subdivision_id
+        )
+        ORDER BY i.subdivision_id
+        ON CONFLICT (project_id, subdivision_id, user_id) DO NOTHING
+        RETURNING project_id, subdivision_id, user_id
+    ),
+    per_cell AS (
+        SELECT subdivision_id, count(*) AS added FROM accepted GROUP BY subdivision_id
+    ),
+    bumped AS (
+        UPDATE subdivisions s
+        SET completion_count = s.completion_count + c.added
+        FROM per_cell c
+        WHERE s.id = c.subdivision_id
+        RETURNING s.id, s.project_id, s.completion_count, c.added
+    ),
+    stats AS (
+        UPDATE project_stats ps
+        SET completion_sum = ps.completion_sum + d.added,
+            zero_completed_subtasks = ps.zero_completed_subtasks - d.left_zero,
+            completed_subtasks = ps.completed_subtasks + d.reached,
+            version = ps.version + 1
+        FROM (
+            SELECT b.project_id,
+                   sum(b.added) AS added,
+                   count(*) FILTER (WHERE b.completion_count = b.added) AS left_zero,
+                   count(*) FILTER (
+                       WHERE b.completion_count - b.added < t.completion_threshold
+                         AND b.completion_count >= t.completion_threshold
+                   ) AS reached
+            FROM bumped b
+            JOIN project_stats t ON t.project_id = b.project_id
+            GROUP BY b.project_id
+        ) d
+        WHERE ps.project_id = d.project_id
+        RETURNING ps.project_id, ps.total_subtasks, ps.completed_subtasks, ps.zero_completed_subtasks,
+                  ps.completion_sum, ps.completion_threshold, ps.version
+    ),
+    user_stats AS (
+        INSERT INTO project_user_stats (project_id, user_id, subdivisions_completed, annotation_count)
+        SELECT a.project_id, a.user_id, count(*), sum(i.annotation_count)
+        FROM accepted a
+        JOIN incoming i USING (project_id, subdivision_id, user_id)
+        GROUP BY a.project_id, a.user_id
+        ON CONFLICT (project_id, user_id) DO UPDATE
+        SET subdivisions_completed = project_user_stats.subdivisions_completed + excluded.subdivisions_completed,
+            annotation_count = project_user_stats.annotation_count + excluded.annotation_count
+    ),
+    released AS (
+        DELETE FROM task_leases l
+        USING accepted a
+        WHERE l.subdivision_id = a.subdivision_id AND l.user_id = a.user_id
+    )
+    SELECT a.project_id, a.subdivision_id, a.user_id, b.completion_count,
+           st.total_subtasks, st.completed_subtasks, st.zero_completed_subtasks,
+           st.completion_sum, st.completion_threshold, st.version
+    FROM accepted a
+    JOIN bumped b ON b.id = a.subdivision_id
+    LEFT JOIN stats st ON st.project_id = a.project_id
+""").bindparams(
+    bindparam("project_ids", type_=ARRAY(Integer)),
+    bindparam("subdivision_ids", type_=ARRAY(Integer)),
+    bindparam("user_ids", type_=ARRAY(Integer)),
+    bindparam("annotation_counts", type_=ARRAY(Integer)),
+)
+
+
+def _stage_live_progress(db: Session, claimed):
+    """Hand the new cell counts and project counters to live.py, published on commit."""
+    projects = {}
+    for row in claimed:
+        projects.setdefault(row.project_id, []).append(row)
+    for project_id, rows in projects.items():
+        last = rows[-1]
+        progress = None
+        if last.version is not None:
+            progress = live.progress_payload(
+                last.total_subtasks, last.completed_subtasks, last.zero_completed_subtasks,
+                last.completion_sum, last.completion_threshold
+            )
+        live.stage(
+            db, project_id, {row.subdivision_id: row.completion_count for row in rows}, progress, last.version
+        )
+
+
+def record_submissions(db: Session, submissions: List[Submission]):
+    """
+    Record submissions and their annotations. Returns a dict keyed by
+    (project_id, subdivision_id, user_id) with a SubmissionResult for every
+    accepted submission; duplicates of an existing submission are left out.
+    The caller commits.
+    """
+    if not submissions:
+        return {}
+
+    claimed = db.execute(_CLAIM_TASKS, {
+        "project_ids": [s.project_id for s in submissions],
+        "subdivision_ids": [s.subdivision_id for s in submissions],
+        "user_ids": [s.user_id for s in submissions],
+        "annotation_counts": [len(s.annotations) for s in submissions],
+    }).all()
+    counts = {(row.project_id, row.subdivision_id, row.user_id): row.completion_count for row in claimed}
+    _stage_live_progress(db, claimed)
+
+    accepted = []
+    seen = set()
+    for submission in submissions:
+        key = (submission.project_id, submission.subdivision_id, submission.user_id)
+        if key in counts and key not in seen:
+            seen.add(key)
+            accepted.append((key, submission))
+
+    rows = [
+        {
+            "project_id": submission.project_id,
+            "subdivision_id": submission.subdivision_id,
+            "user_id": submission.user_id,
+            "label_type": label_type,
+            "label_category": label_category,
+            "magnitude": magnitude,
+            "geom": WKTElement(geom, srid=4326),
+        }
+        for _, submission in accepted
+        for geom, label_type in submission.annotations
+        for label_category, magnitude in [parse_label(label_type)]
+    ]
+    inserted = []
+    if rows:
+        inserted = db.execute(
+            insert(models.Annotation).returning(
+                models.Annotation.id, models.Annotation.created_at, sort_by_parameter_order=True
+            ),
+            rows,
+        ).all()
+
+    results = {}
+    position = 0
+    for key, submission in accepted:
+        count = len(submission.annotations)
+        results[key] = SubmissionResult(
+            completion_count=counts[key],
+            annotations=[tuple(row) for row in inserted[position:position + count]],
+        )
+        position += count
+    return results
@@ -0,0 +1,180 @@
+"""
+Task assignment engine.
+
+Picks the next subdivision for a reviewer without sorting the whole grid.
+Cells are grouped into tiers by completion_count; the lowest tier that still
+has work for the user is sampled from a random id offset. Each step is an
+index seek on (project_id, completion_count, id), so the cost does not grow
+with the size of the grid.
+
+Reviewers can also lease several cells at once. A lease reserves a cell for
+one user until it expires, so concurrent reviewers are handed different cells.
+"""
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, exists
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+import models
+
+# How many completion tiers to walk before falling back to a plain ordered scan
+MAX_TIERS = 8
+
+LEASE_TTL_SECONDS = int(os.getenv("TASK_LEASE_TTL_SECONDS", "600"))
+LEASE_SWEEP_INTERVAL_SECONDS = int(os.getenv("TASK_LEASE_SWEEP_SECONDS", "60"))
+MAX_LEASE_BATCH = 50
+
+
+def _available_to(project_id: int, user_id: int):
+    """Cell not yet annotated by the user and not leased to someone else."""
+    not_done = ~exists().where(
+        models.TaskSubmission.project_id == project_id,
+        models.TaskSubmission.user_id == user_id,
+        models.TaskSubmission.subdivision_id == models.Subdivision.id,
+    )
+    not_leased = ~exists().where(
+        models.TaskLease.subdivision_id == models.Subdivision.id,
+        models.TaskLease.user_id != user_id,
+        models.TaskLease.expires_at > func.now(),
+    )
+    return not_done, not_leased
+
+
+def _next_tier(db: Session, project_id: int, above: int = None):
+    query = db.query(func.min(models.Subdivision.completion_count)).filter(
+        models.Subdivision.project_id == project_id
+    )
+    if above is not None:
+        query = query.filter(models.Subdivision.completion_count > above)
+    return query.scalar()
+
+
+def _pick_in_tier(db: Session, project_id: int, user_id: int, tier: int, limit: int = 1,
+                  exclude=(), lock: bool = False):
+    in_tier = (
+        models.Subdivision.project_id == project_id,
+        models.Subdivision.completion_count == tier,
+    )
+    low, high = db.query(
+        func.min(models.Subdivision.id), func.max(models.Subdivision.id)
+    ).filter(*in_tier).one()
+    if low is None:
+        return []
+
+    pivot = random.randint(low, high)
+    base = db.query(models.Subdivision).filter(*in_tier, *_available_to(project_id, user_id))
+    if exclude:
+        base = base.filter(~models.Subdivision.id.in_(exclude))
+    if lock:
+        # Concurrent leases skip rows another reviewer is reserving right now
+        base = base.with_for_update(skip_locked=True, of=models.Subdivision)
+
+    # Walk forward from the pivot, then wrap around to the start of the tier
+    tasks = base.filter(models.Subdivision.id >= pivot).order_by(models.Subdivision.id).limit(limit).all()
+    if len(tasks) < limit:
+        tasks += base.filter(models.Subdivision.id < pivot).order_by(
+            models.Subdivision.id
+        ).limit(limit - len(tasks)).all()
+    return tasks
+
+
+def _pick(db: Session, project_id: int, user_id: int, limit: int, exclude=(), lock: bool = False):
+    picked = []
+    tier = _next_tier(db, project_id)
+    for _ in range(MAX_TIERS):
+        if tier is None or len(picked) >= limit:
+            return picked
+        picked += _pick_in_tier(
+            db, project_id, user_id, tier, limit - len(picked),
+            exclude=[*exclude, *(t.id for t in picked)], lock=lock
+        )
+        tier = _next_tier(db, project_id, above=tier)
+
+    if tier is None or len(picked) >= limit:
+        return picked
+
+    # Many tiers already done by this user: take the least completed remaining cells
+    query = db.query(models.Subdivision).filter(
+        models.Subdivision.project_id == project_id,
+        models.Subdivision.completion_count >= tier,
+        *_available_to(project_id, user_id),
+    )
+    if lock:
+        query = query.with_for_update(skip_locked=True, of=models.Subdivision)
+    return picked + query.order_by(
+        models.Subdivision.completion_count, models.Subdivision.id
+    ).limit(limit - len(picked)).all()
+
+
+def pick_next_task(db: Session, project_id: int, user_id: int):
+    """
+    Return a subdivision the user has not annotated yet, favouring the least
+    completed cells. Returns None when the user has finished the project.
+    """
+    tasks = _pick(db, project_id, user_id, limit=1)
+    return tasks[0] if tasks else None
+
+
+def lease_tasks(db: Session, project_id: int, user_id: int, n: int, ttl_seconds: int = LEASE_TTL_SECONDS):
+    """
+    Reserve up to n cells for the user and return them with the lease expiry.
+    Leases the user already holds in the project are renewed and returned first.
+    The caller commits, which also releases the row locks taken while picking.
+    """
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)
+
+    held = db.query(models.Subdivision).join(
+        models.TaskLease, models.TaskLease.subdivision_id == models.Subdivision.id
+    ).filter(
+        models.TaskLease.project_id == project_id,
+        models.TaskLease.user_id == user_id,
+        models.TaskLease.expires_at > func.now(),
+        _available_to(project_id, user_id)[0],
+    ).order_by(models.Subdivision.id).limit(n).all()
+
+    fresh = []
+    if len(held) < n:
+        fresh = _pick(db, project_id, user_id, n - len(held), exclude=[t.id for t in held], lock=True)
+
+    tasks = held + fresh
+    if not tasks:
+        return [], expires_at
+
+    # Expired leases that the sweeper has not removed yet are taken over in place
+    stmt = insert(models.TaskLease).values([
+        {"project_id": project_id, "subdivision_id": t.id, "user_id": user_id, "expires_at": expires_at}
+        for t in tasks
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.TaskLease.subdivision_id],
+        set_={"user_id": stmt.excluded.user_id, "expires_at": stmt.excluded.expires_at},
+        where=(models.TaskLease.user_id == user_id) | (models.TaskLease.expires_at <= func.now()),
+    ).returning(models.TaskLease.subdivision_id)
+    leased = set(db.execute(stmt).scalars())
+
+    return [t for t in tasks if t.id in leased], expires_at
+
+
+def release_lease(db: Session, project_id: int, user_id: int, subdivision_id: int = None):
+    """
+    Drop the user's leases in a project, or only the one on subdivision_id.
+    The caller commits.
+    """
+    query = db.query(models.TaskLease).filter(
+        models.TaskLease.project_id == project_id,
+        models.TaskLease.user_id == user_id,
+    )
+    if subdivision_id is not None:
+        query = query.filter(models.TaskLease.subdivision_id == subdivision_id)
+    return query.delete(synchronize_session=False)
+
+
+def release_expired_leases(db: Session):
+    released = db.query(models.TaskLease).filter(
+        models.TaskLease.expires_at <= func.now()
+    ).delete(synchronize_session=False)
+    db.commit()
+    return released
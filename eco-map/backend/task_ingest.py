@@ -0,0 +1,151 @@
+"""
+Bulk task ingestion.
+
+Task geometries arrive as WKT strings or GeoJSON (a request body, a GeoJSON
+FeatureCollection file or an NDJSON file with one Feature/geometry per line).
+They are parsed and validated in chunks with shapely's vectorized readers,
+rejected rows are reported by their position in the input, and the valid
+polygons are streamed into subdivisions with COPY.
+"""
+import io
+import json
+from itertools import islice
+
+import numpy as np
+import shapely
+from sqlalchemy.orm import Session
+
+INGEST_CHUNK_SIZE = 20000
+MAX_REPORTED_REJECTIONS = 1000
+
+NDJSON_EXTENSIONS = (".ndjson", ".geojsonl", ".geojsons", ".jsonl")
+
+
+def _as_text(item):
+    if isinstance(item, str):
+        return item
+    return json.dumps(item)
+
+
+def parse_geometries(items, start_index: int = 0):
+    """
+    Parse a chunk of WKT / GeoJSON items into polygons.
+
+    Returns (polygons, rejected) where polygons is an array of valid shapely
+    Polygons and rejected is a list of {"index", "reason"} dicts, with index
+    counted from start_index.
+    """
+    texts = np.array([_as_text(item).strip() for item in items], dtype=object)
+    is_json = np.array([text.startswith("{") for text in texts], dtype=bool)
+
+    geoms = np.empty(len(texts), dtype=object)
+    if is_json.any():
+        geoms[is_json] = shapely.from_geojson(texts[is_json], on_invalid="ignore")
+    if (~is_json).any():
+        geoms[~is_json] = shapely.from_wkt(texts[~is_json], on_invalid="ignore")
+
+    missing = shapely.is_missing(geoms)
+    is_polygon = shapely.get_type_id(geoms) == shapely.GeometryType.POLYGON
+    empty = shapely.is_empty(geoms)
+    valid = shapely.is_valid(geoms)
+
+    accepted = ~missing & is_polygon & ~empty & valid
+
+    rejected = []
+    for position in np.flatnonzero(~accepted):
+        if missing[position]:
+            reason = "Could not parse geometry"
+        elif not is_polygon[position]:
+            reason = f"Expected Polygon, got {geoms[position].geom_type}"
+        elif empty[position]:
+            reason = "Empty geometry"
+        else:
+            reason = shapely.is_valid_reason(geoms[position])
+        rejected.append({"index": start_index + int(position), "reason": reason})
+
+    return geoms[accepted], rejected
+
+
+def copy_subdivisions(db: Session, project_id: int, polygons):
+    """
+    Stream polygons into subdivisions with COPY, inside the session's transaction.
+    """
+    if len(polygons) == 0:
+        return 0
+
+    ewkb = shapely.to_wkb(shapely.set_srid(polygons, 4326), hex=True, include_srid=True)
+    prefix = f"{project_id}\t"
+    buffer = io.StringIO("".join(prefix + geom + "\t0\n" for geom in ewkb))
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert("COPY subdivisions (project_id, geom, completion_count) FROM STDIN", buffer)
+    finally:
+        cursor.close()
+    return len(polygons)
+
+
+def ingest_tasks(db: Session, project_id: int, items, on_progress=None):
+    """
+    Validate and COPY an iterable of task geometries in chunks.
+
+    on_progress is called with the number of input rows processed after each
+    chunk. Returns a summary with the created count and rejected rows; only
+    the first MAX_REPORTED_REJECTIONS rejections are listed. The caller commits.
+    """
+    iterator = iter(items)
+    processed = 0
+    created = 0
+    rejected_count = 0
+    rejected = []
+
+    while True:
+        chunk = list(islice(iterator, INGEST_CHUNK_SIZE))
+        if not chunk:
+            break
+
+        polygons, chunk_rejected = parse_geometries(chunk, start_index=processed)
+        created += copy_subdivisions(db, project_id, polygons)
+        rejected_count += len(chunk_rejected)
+        rejected += chunk_rejected[:MAX_REPORTED_REJECTIONS - len(rejected)]
+        processed += len(chunk)
+
+        if on_progress is not None:
+            on_progress(processed)
+
+    return {
+        "project_id": project_id,
+        "tasks_created": created,
+        "rejected_count": rejected_count,
+        "rejected": rejected,
+    }
+
+
+def iter_upload(file, filename: str = ""):
+    """
+    Yield geometries from an uploaded file object opened in binary mode.
+
+    NDJSON files (by extension) are read line by line and each line is passed
+    on as raw GeoJSON text. Anything else is loaded as GeoJSON: a
+    FeatureCollection, a list of Features/geometries, or a single geometry.
+    """
+    if filename.lower().endswith(NDJSON_EXTENSIONS):
+        for line in io.TextIOWrapper(file, encoding="utf-8"):
+            line = line.strip()
+            if line:
+                yield line
+        return
+
+    document = json.load(file)
+    if isinstance(document, dict) and document.get("type") == "FeatureCollection":
+        features = document.get("features") or []
+    elif isinstance(document, list):
+        features = document
+    else:
+        features = [document]
+
+    for feature in features:
+        if isinstance(feature, dict) and feature.get("type") == "Feature":
+            yield feature.get("geometry") or {}
+        else:
+            yield feature
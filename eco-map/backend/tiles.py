@@ -0,0 +1,115 @@
+"""
+Mapbox Vector Tiles for project maps.
+
+Tiles are rendered by PostGIS (ST_AsMVTGeom / ST_AsMVT) from the rows that
+intersect the tile envelope, so a client only ever downloads what is on
+screen. Three layers are served:
+
+  subdivisions - grid cells with their completion_count
+  annotations  - annotation points with their label, category and magnitude,
+                 from ANNOTATION_MIN_ZOOM
+  heat         - annotation counts and magnitude sums binned to
+                 HEAT_BINS x HEAT_BINS per tile
+
+Rendered tiles are cached per project version (see progress.project_version),
+so a submission or a grid change makes every cached tile of the project stale
+without an explicit purge.
+"""
+import os
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from cache import LRUCache
+
+TILE_CACHE_SIZE = int(os.getenv("TILE_CACHE_SIZE", "2048"))
+ANNOTATION_MIN_ZOOM = int(os.getenv("TILE_ANNOTATION_MIN_ZOOM", "10"))
+HEAT_BINS = 64
+MAX_ZOOM = 22
+
+EXTENT = 4096
+BUFFER = 64
+MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+# Width of the web mercator world in metres
+WORLD_SIZE = 40075016.68557849
+
+_ENVELOPE = """
+    bounds AS (
+        SELECT ST_TileEnvelope(:z, :x, :y) AS env,
+               ST_Transform(ST_TileEnvelope(:z, :x, :y), 4326) AS env_4326
+    )
+"""
+
+_QUERIES = {
+    "subdivisions": text(f"""
+        WITH {_ENVELOPE},
+        features AS (
+            SELECT s.id, s.completion_count,
+                   ST_AsMVTGeom(ST_Transform(s.geom, 3857), b.env, {EXTENT}, {BUFFER}, true) AS geom
+            FROM subdivisions s, bounds b
+            WHERE s.project_id = :project_id AND s.geom && b.env_4326
+        )
+        -- Cells smaller than a tile pixel collapse to NULL and are dropped
+        SELECT ST_AsMVT(features, 'subdivisions', {EXTENT}, 'geom')
+        FROM features WHERE geom IS NOT NULL
+    """),
+    "annotations": text(f"""
+        WITH {_ENVELOPE},
+        features AS (
+            SELECT a.id, a.subdivision_id, a.label_type, a.label_category, a.magnitude,
+                   ST_AsMVTGeom(ST_Transform(a.geom, 3857), b.env, {EXTENT}, {BUFFER}, true) AS geom
+            FROM annotations a, bounds b
+            WHERE a.project_id = :project_id AND a.geom && b.env_4326
+        )
+        SELECT ST_AsMVT(features, 'annotations', {EXTENT}, 'geom')
+        FROM features WHERE geom IS NOT NULL
+    """),
+    "heat": text(f"""
+        WITH {_ENVELOPE},
+        bins AS (
+            SELECT ST_SnapToGrid(ST_Transform(a.geom, 3857), :bin_size) AS cell, count(*) AS count,
+                   coalesce(sum(a.magnitude) FILTER (WHERE a.magnitude > 0), 0) AS magnitude
+            FROM annotations a, bounds b
+            WHERE a.project_id = :project_id AND a.geom && b.env_4326
+            GROUP BY 1
+        ),
+        features AS (
+            SELECT count, magnitude, ST_AsMVTGeom(cell, b.env, {EXTENT}, {BUFFER}, true) AS geom
+            FROM bins, bounds b
+        )
+        SELECT ST_AsMVT(features, 'heat', {EXTENT}, 'geom')
+        FROM features WHERE geom IS NOT NULL
+    """),
+}
+
+LAYERS = tuple(_QUERIES)
+
+_tiles = LRUCache(TILE_CACHE_SIZE)
+
+
+def valid_tile(z: int, x: int, y: int):
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def render_tile(db: Session, project_id: int, version: int, layer: str, z: int, x: int, y: int):
+    """
+    Encoded MVT bytes for one tile of a layer, served from the cache when the
+    project has not changed since it was rendered.
+    """
+    key = (project_id, version, layer, z, x, y)
+    tile = _tiles.get(key)
+    if tile is not None:
+        return tile
+
+    if layer == "annotations" and z < ANNOTATION_MIN_ZOOM:
+        # Too many points to be useful this far out; the heat layer covers it
+        tile = b""
+    else:
+        params = {"project_id": project_id, "z": z, "x": x, "y": y}
+        if layer == "heat":
+            params["bin_size"] = WORLD_SIZE / 2 ** z / HEAT_BINS
+        tile = bytes(db.execute(_QUERIES[layer], params).scalar() or b"")
+
+    _tiles.set(key, tile)
+    return tile
@@ -0,0 +1,102 @@
+"""
+Viewport-aware geometry queries.
+
+Map views pass bbox=min_lng,min_lat,max_lng,max_lat to get only the rows
+whose geometry touches the screen. The && test runs on the GiST indexes
+GeoAlchemy2 creates for every geometry column, and ST_Intersects then refines
+the match. A zoom level picks one of a few simplification tolerances, roughly
+one screen pixel at that zoom. Simplified project boundaries are cached per
+(project, tolerance) because dashboards redraw the same boundaries at the
+same few zoom levels.
+"""
+import math
+import os
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from cache import LRUCache
+import models
+from serialize import GEOJSON_PRECISION
+
+SIMPLIFIED_BOUNDARY_CACHE_SIZE = int(os.getenv("SIMPLIFIED_BOUNDARY_CACHE_SIZE", "4096"))
+
+# (highest zoom, tolerance in degrees); past the last level geometry is sent as stored
+TOLERANCE_LEVELS = (
+    (5, 0.01),
+    (9, 0.001),
+    (13, 0.0001),
+)
+
+_boundaries = LRUCache(SIMPLIFIED_BOUNDARY_CACHE_SIZE)
+
+
+def parse_bbox(bbox: str):
+    """
+    Parse "min_x,min_y,max_x,max_y" into floats, or None if it is not a
+    finite, non-empty box.
+    """
+    try:
+        bounds = [float(value) for value in bbox.split(",")]
+    except ValueError:
+        return None
+    if len(bounds) != 4 or not all(math.isfinite(value) for value in bounds):
+        return None
+    if bounds[0] >= bounds[2] or bounds[1] >= bounds[3]:
+        return None
+    return bounds
+
+
+def intersects(column, bounds):
+    """Index-backed filter for geometries touching the bbox."""
+    envelope = func.ST_MakeEnvelope(*bounds, 4326)
+    return column.op("&&")(envelope) & func.ST_Intersects(column, envelope)
+
+
+def tolerance(zoom: int = None):
+    if zoom is None:
+        return None
+    for max_zoom, value in TOLERANCE_LEVELS:
+        if zoom <= max_zoom:
+            return value
+    return None
+
+
+def geojson(column, zoom: int = None, label: str = "geometry"):
+    """The column as GeoJSON text, simplified for the zoom level if one is given."""
+    value = tolerance(zoom)
+    if value is not None:
+        column = func.ST_SimplifyPreserveTopology(column, value)
+    return func.ST_AsGeoJSON(column, GEOJSON_PRECISION).label(label)
+
+
+def project_boundaries(db: Session, project_ids, zoom: int):
+    """
+    GeoJSON text of each project boundary simplified for the zoom level,
+    keyed by project id. Only cache misses are simplified in PostGIS.
+    """
+    value = tolerance(zoom)
+    found = {}
+    missing = []
+    for project_id in project_ids:
+        geometry = _boundaries.get((project_id, value))
+        if geometry is None:
+            missing.append(project_id)
+        else:
+            found[project_id] = geometry
+
+    if missing:
+        rows = db.execute(
+            select(models.Project.id, geojson(models.Project.boundary_geom, zoom))
+            .where(models.Project.id.in_(missing), models.Project.boundary_geom.isnot(None))
+        ).all()
+        for project_id, geometry in rows:
+            _boundaries.set((project_id, value), geometry)
+            found[project_id] = geometry
+    return found
+
+
+def invalidate_project(project_id: int):
+    for _, value in TOLERANCE_LEVELS:
+        _boundaries.pop((project_id, value))
+    _boundaries.pop((project_id, None))
@@ -0,0 +1,170 @@
+"""
+Group-commit write-behind buffer for annotation submissions.
+
+With ANNOTATION_WRITE_MODE=buffered, /annotations/batch validates a submission
+synchronously and then hands it to this buffer instead of opening its own
+transaction. A background flusher drains the queue every
+WRITE_BEHIND_INTERVAL_MS or as soon as WRITE_BEHIND_MAX_ROWS annotation rows
+are waiting, and records the whole group with submissions.record_submissions
+in one transaction, so many requests share one commit and one fsync.
+
+WRITE_BEHIND_ACK picks the durability mode:
+  flush   - the request waits until its group is committed (default)
+  enqueue - the request returns once queued; a crash loses queued work and
+            duplicate submissions are dropped silently at flush time
+
+The queue is bounded; when it stays full for WRITE_BEHIND_ENQUEUE_TIMEOUT
+seconds the submission is refused with QueueFull. stop() drains whatever is
+queued before returning and fails anything the flusher did not get to.
+
+A submission that cannot be written is logged at error level and counted in
+ecomap_write_behind_failed_submissions_total; with WRITE_BEHIND_ACK=enqueue
+that is the only trace of it, since the client was already answered.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+
+from database import SessionLocal
+import metrics
+import submissions
+
+logger = logging.getLogger(__name__)
+
+ANNOTATION_WRITE_MODE = os.getenv("ANNOTATION_WRITE_MODE", "direct")
+WRITE_BEHIND_ACK = os.getenv("WRITE_BEHIND_ACK", "flush")
+WRITE_BEHIND_INTERVAL_MS = int(os.getenv("WRITE_BEHIND_INTERVAL_MS", "20"))
+WRITE_BEHIND_MAX_ROWS = int(os.getenv("WRITE_BEHIND_MAX_ROWS", "1000"))
+WRITE_BEHIND_QUEUE_SIZE = int(os.getenv("WRITE_BEHIND_QUEUE_SIZE", "10000"))
+WRITE_BEHIND_ENQUEUE_TIMEOUT = float(os.getenv("WRITE_BEHIND_ENQUEUE_TIMEOUT", "2"))
+# How long a request waits for its group commit before giving up with 503
+WRITE_BEHIND_ACK_TIMEOUT = float(os.getenv("WRITE_BEHIND_ACK_TIMEOUT", "30"))
+
+ENABLED = ANNOTATION_WRITE_MODE == "buffered"
+ACK_ON_ENQUEUE = WRITE_BEHIND_ACK == "enqueue"
+
+
+class QueueFull(Exception):
+    pass
+
+
+def _settle(future: Future, result=None, error: Exception = None):
+    # stop() may already have failed the future
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+def _report_failure(submission: submissions.Submission, error: Exception):
+    metrics.WRITE_BEHIND_FAILURES.inc()
+    logger.error(
+        "Write-behind submission failed (user %s, project %s, subdivision %s, %d annotations): %s",
+        submission.user_id, submission.project_id, submission.subdivision_id, len(submission.annotations), error,
+    )
+
+
+class WriteBehindBuffer:
+    def __init__(self, interval_ms: int = WRITE_BEHIND_INTERVAL_MS, max_rows: int = WRITE_BEHIND_MAX_ROWS,
+                 queue_size: int = WRITE_BEHIND_QUEUE_SIZE):
+        self.interval = interval_ms / 1000
+        self.max_rows = max_rows
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="ecomap-write-behind", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30):
+        """
+        Stop accepting work and wait for everything queued to be flushed.
+        """
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+        # Left behind by a flusher that timed out or died, or queued while stopping
+        while True:
+            try:
+                submission, future = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            error = QueueFull("Write-behind buffer stopped before the submission was written")
+            _report_failure(submission, error)
+            _settle(future, error=error)
+
+    def submit(self, submission: submissions.Submission, timeout: float = WRITE_BEHIND_ENQUEUE_TIMEOUT):
+        """
+        Queue a submission. Returns a Future resolving to its SubmissionResult,
+        or None when the task was already completed by the user.
+        """
+        if self._stopping.is_set():
+            raise QueueFull("Write-behind buffer is shutting down")
+        future = Future()
+        try:
+            self._queue.put((submission, future), timeout=timeout)
+        except queue.Full:
+            raise QueueFull("Annotation queue is full")
+        return future
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            try:
+                first = self._queue.get(timeout=self.interval)
+            except queue.Empty:
+                continue
+
+            group = [first]
+            rows = len(first[0].annotations)
+            deadline = time.monotonic() + self.interval
+            while rows < self.max_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                group.append(item)
+                rows += len(item[0].annotations)
+
+            self._flush(group)
+
+    def _flush(self, group):
+        try:
+            self._write(group)
+        except Exception:
+            # One bad submission must not fail the rest of the group
+            for item in group:
+                try:
+                    self._write([item])
+                except Exception as e:
+                    _report_failure(item[0], e)
+                    _settle(item[1], error=e)
+
+    def _write(self, group):
+        db = SessionLocal()
+        try:
+            results = submissions.record_submissions(db, [submission for submission, _ in group])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        # Only the first copy of a task was recorded; later copies get None, the
+        # same "already completed" answer as the direct write path
+        for submission, future in group:
+            _settle(future, results.pop(submission[:3], None))
+
+
+buffer = WriteBehindBuffer()
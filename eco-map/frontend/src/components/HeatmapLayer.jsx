@@ -1,6 +1,10 @@
 import { useEffect, useRef } from 'react';
+import axios from 'axios';
 import { useMap } from 'react-leaflet';
 
+// Screen pixels per server-side bin
+const BIN_PIXELS = 16;
+
 // Color gradient function (0 → 1 mapped to blue → red)
 const getHeatColor = (intensity) => {
   // intensity 0-1
@@ -21,40 +25,58 @@ const getHeatColor = (intensity) => {
 
 const clamp01 = (value) => Math.min(1, Math.max(0, value));
 
-const HeatmapLayer = ({ annotations, maxMagnitude, threshold }) => {
+const HeatmapLayer = ({ projectId, threshold }) => {
   const map = useMap();
   const layerRef = useRef(null);
 
   useEffect(() => {
-    if (!map || !annotations.length || maxMagnitude <= 0) return;
+    if (!map || !projectId) return;
+
+    let requestId = 0;
 
     try {
-      const renderHeatmap = () => {
+      const renderHeatmap = async () => {
+        const currentRequest = ++requestId;
+        const bounds = map.getBounds();
+        const mapSize = map.getSize();
+
+        // Binned on the server: the payload depends on the viewport, not the annotation count
+        const token = localStorage.getItem('token');
+        const { data: bins } = await axios.get(
+          `http://localhost:8000/projects/${projectId}/heatmap`,
+          {
+            headers: { Authorization: `Bearer ${token}` },
+            params: {
+              bbox: [bounds.getWest(), bounds.getSouth(), bounds.getEast(), bounds.getNorth()].join(','),
+              resolution: Math.max(1, Math.min(512, Math.ceil(mapSize.x / BIN_PIXELS))),
+            },
+          }
+        );
+        // A newer pan/zoom has started its own request
+        if (currentRequest !== requestId) return;
+
         if (layerRef.current) {
           map.removeLayer(layerRef.current);
           layerRef.current = null;
         }
 
+        const maxMagnitude = bins.max_magnitude;
+        if (!bins.count.length || maxMagnitude <= 0) return;
+
         const thresholdFloor = clamp01(threshold);
 
-        // Build normalized point intensities (after threshold remap)
-        const heatPoints = annotations
-          .filter((a) => {
-            if (!a.geometry?.coordinates || !a.label_type) return false;
-            const magnitude = parseInt(a.label_type.split(':')[1] || 10, 10);
-            return Number.isFinite(magnitude) && magnitude > 0;
-          })
-          .map((a) => {
-            const [lng, lat] = a.geometry.coordinates;
-            const magnitude = parseInt(a.label_type.split(':')[1] || 10, 10);
-            const rawIntensity = clamp01(magnitude / maxMagnitude);
+        // Build normalized bin intensities (after threshold remap) from the mean magnitude
+        const heatPoints = bins.count
+          .map((count, i) => {
+            const rawIntensity = clamp01(bins.sum[i] / count / maxMagnitude);
             const normalizedIntensity = thresholdFloor >= 1
               ? 0
               : clamp01((rawIntensity - thresholdFloor) / (1 - thresholdFloor));
             return {
-              lat,
-              lng,
+              lat: bins.y[i],
+              lng: bins.x[i],
               intensity: normalizedIntensity,
+              weight: normalizedIntensity * count,
             };
           })
           .filter((p) => p.intensity > 0);
@@ -62,8 +84,7 @@ const HeatmapLayer = ({ annotations, maxMagnitude, threshold }) => {
         if (!heatPoints.length) return;
 
         // Kernel density estimation on a pixel grid
-        const mapSize = map.getSize();
-        const cellSize = 10; 
+        const cellSize = 10;
         const gridWidth = Math.ceil(mapSize.x / cellSize);
         const gridHeight = Math.ceil(mapSize.y / cellSize);
         const grid = new Float32Array(gridWidth * gridHeight);
@@ -94,7 +115,7 @@ const HeatmapLayer = ({ annotations, maxMagnitude, threshold }) => {
               const dy = cy - pixel.y;
               const dist2 = dx * dx + dy * dy;
               if (dist2 > radius * radius) continue;
-              const influence = Math.exp(-dist2 / (2 * sigma2)) * point.intensity;
+              const influence = Math.exp(-dist2 / (2 * sigma2)) * point.weight;
               addToGrid(gx, gy, influence);
             }
           }
@@ -124,8 +145,7 @@ const HeatmapLayer = ({ annotations, maxMagnitude, threshold }) => {
           }
         }
 
-        // Overlay the raster on the current map bounds
-        const bounds = map.getBounds();
+        // Overlay the raster on the map bounds the bins were requested for
         const imageUrl = canvas.toDataURL('image/png');
         const heatmapLayer = L.imageOverlay(imageUrl, bounds, {
           interactive: false,
@@ -135,15 +155,20 @@ const HeatmapLayer = ({ annotations, maxMagnitude, threshold }) => {
         layerRef.current = heatmapLayer;
       };
 
+      const refresh = () => {
+        renderHeatmap().catch((error) => console.error('Error loading heatmap bins:', error));
+      };
+
       // Re-render on move/zoom so the raster stays aligned
-      renderHeatmap();
+      refresh();
 
-      map.on('moveend', renderHeatmap);
-      map.on('zoomend', renderHeatmap);
+      map.on('moveend', refresh);
+      map.on('zoomend', refresh);
 
       return () => {
-        map.off('moveend', renderHeatmap);
-        map.off('zoomend', renderHeatmap);
+        requestId += 1;
+        map.off('moveend', refresh);
+        map.off('zoomend', refresh);
         if (layerRef.current) {
           try {
             map.removeLayer(layerRef.current);
@@ -156,7 +181,7 @@ const HeatmapLayer = ({ annotations, maxMagnitude, threshold }) => {
     } catch (error) {
       console.error('Error rendering heatmap:', error);
     }
-  }, [annotations, maxMagnitude, threshold, map]);
+  }, [projectId, threshold, map]);
 
   return null;
 };
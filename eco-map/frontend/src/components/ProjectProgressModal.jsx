@@ -86,7 +86,7 @@ const ProjectProgressModal = ({ projectId, projectName, onClose, isOpen = true }
                 {annotations.map((ann) => {
                   const coords = ann.geometry?.coordinates;
                   if (!coords) return null;
-                  const scale = parseInt(ann.label_type?.split(':')[1] || 10, 10);
+                  const scale = ann.magnitude ?? 0;
                   return (
                     <CircleMarker
                       key={ann.id}
@@ -6,6 +6,7 @@ import { Navbar } from '../components/layout/Navbar';
 import { Footer } from '../components/layout/Footer';
 import { Button } from '../components/ui/Button';
 import { createSquareFromPoint } from '../utils/geoUtils'; 
+import { waitForJob } from '../utils/jobs';
 
 // Map Imports
 import { MapContainer, TileLayer, Polygon, Rectangle, useMap } from 'react-leaflet';
@@ -171,6 +172,7 @@ const CreateMissionPage = () => {
   const navigate = useNavigate();
   const [step, setStep] = useState(1);
   const [loading, setLoading] = useState(false);
+  const [jobStatus, setJobStatus] = useState('');
   const [mode, setMode] = useState('EXPLORE'); 
   
   // Form Data
@@ -227,25 +229,38 @@ const CreateMissionPage = () => {
       
       const projectId = projectRes.data.id;
 
-      // Generate Subdivisions
+      // Generate Subdivisions in a background job so large missions don't time out
+      let jobRes = null;
       if (mode === 'EXPLORE') {
         // Send the slider values from Step 4
-        await axios.post(`http://localhost:8000/projects/${projectId}/generate-grid`, {
+        jobRes = await axios.post(`http://localhost:8000/projects/${projectId}/generate-grid?background=true`, {
           rows: gridConfig.rows, 
           cols: gridConfig.cols
         }, config);
       } else if (mode === 'VALIDATE') {
-        await axios.post(`http://localhost:8000/projects/${projectId}/tasks/batch`, {
+        jobRes = await axios.post(`http://localhost:8000/projects/${projectId}/tasks/batch?background=true`, {
           tasks: csvTasks
         }, config);
       }
 
+      // Stay on the page until the tasks exist, so a failed build is not missed
+      if (jobRes) {
+        const job = await waitForJob(jobRes.data.id, config, (running) => {
+          setJobStatus(running.total ? `${Math.round((running.progress / running.total) * 100)}%` : running.status);
+        });
+        if (job.status !== 'succeeded') {
+          alert(`Mission created, but building its tasks ${job.status}: ${job.error || 'no details'}`);
+          return;
+        }
+      }
+
       navigate('/admin');
     } catch (error) {
       console.error(error);
       alert("Failed to create mission.");
     } finally {
       setLoading(false);
+      setJobStatus('');
     }
   };
 
@@ -340,7 +355,7 @@ const CreateMissionPage = () => {
                           disabled={loading || csvTasks.length === 0}
                           className="bg-emerald-600 hover:bg-emerald-700 text-white w-40"
                         >
-                          {loading ? 'Launching...' : 'Launch Mission'}
+                          {loading ? `Launching... ${jobStatus}` : 'Launch Mission'}
                         </Button>
                       )}
                    </div>
@@ -442,7 +457,7 @@ const CreateMissionPage = () => {
 
                    <div className="space-y-3 pt-6 border-t border-slate-100">
                       <Button className="w-full bg-blue-600 hover:bg-blue-700 text-white" onClick={handleSubmit} disabled={loading}>
-                        {loading ? 'Processing...' : 'Launch Mission'}
+                        {loading ? `Processing... ${jobStatus}` : 'Launch Mission'}
                       </Button>
                       <Button variant="ghost" className="w-full" onClick={() => setStep(3)}>Back to Drawing</Button>
                    </div>
@@ -4,13 +4,17 @@ import { useParams, useNavigate } from 'react-router-dom';
 import { ArrowLeft, RotateCw } from 'lucide-react';
 import { MapContainer, TileLayer, Polygon, Circle, useMap } from 'react-leaflet';
 import 'leaflet/dist/leaflet.css';
+import * as turf from '@turf/turf';
 
 import { Navbar } from '../components/layout/Navbar';
 import { Footer } from '../components/layout/Footer';
 import { Button } from '../components/ui/Button';
 import HeatmapLayer from '../components/HeatmapLayer';
+import { decodeGeobin, GEOBIN_MEDIA_TYPE } from '../utils/geobin';
+import { subscribeProgress } from '../utils/progressStream';
 
 const MAX_SCALE = 50;
+const INT32_NULL = -2147483648;
 
 const FitBounds = ({ polygon }) => {
   const map = useMap();
@@ -25,7 +29,7 @@ const ProjectProgressPage = () => {
   const { projectId } = useParams();
   const navigate = useNavigate();
   const [project, setProject] = useState(null);
-  const [subdivisions, setSubdivisions] = useState([]);
+  const [progress, setProgress] = useState(null);
   const [annotations, setAnnotations] = useState([]);
   const [loading, setLoading] = useState(true);
   const [displayMode, setDisplayMode] = useState('annotations');
@@ -40,19 +44,28 @@ const ProjectProgressPage = () => {
       const projRes = await axios.get(`http://localhost:8000/projects/${projectId}`, config);
       setProject(projRes.data);
 
-      // Fetch all subdivisions (grid)
-      const subdivRes = await axios.get(
-        `http://localhost:8000/projects/${projectId}/subdivisions`,
+      // Cached grid counters instead of every subdivision polygon
+      const progressRes = await axios.get(
+        `http://localhost:8000/projects/${projectId}/progress`,
         config
       );
-      setSubdivisions(subdivRes.data);
+      setProgress(progressRes.data);
 
-      // Fetch all annotations
+      // Fetch all annotations in the compact binary format
       const annotRes = await axios.get(
         `http://localhost:8000/projects/${projectId}/annotations`,
-        config
+        {
+          headers: { ...config.headers, Accept: GEOBIN_MEDIA_TYPE },
+          responseType: 'arraybuffer',
+        }
       );
-      setAnnotations(annotRes.data || []);
+      const { count, coords, columns } = decodeGeobin(annotRes.data);
+      setAnnotations(Array.from({ length: count }, (_, i) => ({
+        id: columns.id[i],
+        user_id: columns.user_id[i],
+        magnitude: columns.magnitude[i] === INT32_NULL ? null : columns.magnitude[i],
+        geometry: { type: 'Point', coordinates: [coords[i * 2], coords[i * 2 + 1]] },
+      })));
     } catch (error) {
       console.error('Error fetching project progress:', error);
     } finally {
@@ -64,43 +77,37 @@ const ProjectProgressPage = () => {
     fetchData();
   }, [projectId]);
 
+  // Counters update live; a resync without counters means events were dropped
+  useEffect(() => subscribeProgress(projectId, async (event) => {
+    if (event.progress) {
+      setProgress(prev => prev && { ...prev, ...event.progress });
+    } else if (event.resync) {
+      const token = localStorage.getItem('token');
+      const res = await axios.get(`http://localhost:8000/projects/${projectId}/progress`, {
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      setProgress(res.data);
+    }
+  }), [projectId]);
+
   const handleRefresh = async () => {
     setLoading(true);
     await fetchData();
   };
 
   const polygonCoords = project?.geometry?.coordinates?.[0]?.map(([lng, lat]) => [lat, lng]);
-  const subdivisionPolygons = subdivisions.map((sub) => {
-    if (!sub.geometry) return null;
-    const coords = sub.geometry?.coordinates?.[0]?.map(([lng, lat]) => [lat, lng]);
-    return { id: sub.id, coords, completionCount: sub.completion_count };
-  }).filter(Boolean);
-
-  const avgSubtaskSize = subdivisions
-    .map((sub) => sub.geometry?.coordinates?.[0])
-    .filter(Boolean)
-    .map((coords) => {
-      const lats = coords.map((c) => c[1]);
-      const lngs = coords.map((c) => c[0]);
-      const width = Math.max(...lngs) - Math.min(...lngs);
-      const height = Math.max(...lats) - Math.min(...lats);
-      const avgLat = (Math.max(...lats) + Math.min(...lats)) / 2;
-      const widthMeters = width * 111000 * Math.cos(avgLat * Math.PI / 180);
-      const heightMeters = height * 111000;
-      return Math.min(widthMeters, heightMeters);
-    })
-    .reduce((sum, size, _, arr) => sum + size / arr.length, 0);
+  // Approximate cell size from the project area, assuming square cells
+  const totalGridSquares = progress?.total_subtasks || 0;
+  const avgSubtaskSize = project?.geometry && totalGridSquares > 0
+    ? Math.sqrt(turf.area(project.geometry) / totalGridSquares)
+    : 0;
 
   const scaleMultiplier = avgSubtaskSize > 0 ? avgSubtaskSize / (MAX_SCALE * 5) : 1;
 
   // Calculate stats
   const totalAnnotations = annotations.length;
   const uniqueUsers = new Set(annotations.map(a => a.user_id)).size;
-  const completedGridSquares = subdivisions.filter(s => s.completion_count > 0).length;
-  const totalGridSquares = subdivisions.length;
-  const avgCompletions = subdivisions.length > 0 
-    ? (subdivisions.reduce((sum, s) => sum + s.completion_count, 0) / subdivisions.length).toFixed(1)
-    : 0;
+  const completedGridSquares = totalGridSquares - (progress?.zero_completed_subtasks || 0);
 
   if (loading) {
     return (
@@ -199,7 +206,8 @@ const ProjectProgressPage = () => {
                       {annotations.map((ann) => {
                         const coords = ann.geometry?.coordinates;
                         if (!coords) return null;
-                        const scale = parseInt(ann.label_type?.split(':')[1] || 10, 10);
+                        // Parsed from the label on the server
+                        const scale = ann.magnitude;
                         if (!Number.isFinite(scale) || scale <= 0) return null;
                         return (
                           <Circle
@@ -213,13 +221,9 @@ const ProjectProgressPage = () => {
                     </>
                   )}
 
-                  {displayMode === 'heatmap' && annotations.length > 0 && (
+                  {displayMode === 'heatmap' && (
                     <HeatmapLayer
-                      annotations={annotations}
-                      maxMagnitude={Math.max(...annotations.map(a => {
-                        const magnitude = parseInt(a.label_type?.split(':')[1] || 10, 10);
-                        return Number.isFinite(magnitude) && magnitude > 0 ? magnitude : 0;
-                      }))}
+                      projectId={projectId}
                       threshold={heatThreshold}
                     />
                   )}
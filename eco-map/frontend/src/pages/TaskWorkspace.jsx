@@ -1,4 +1,4 @@
-import React, { useCallback, useEffect, useMemo, useState } from 'react';
+import React, { useCallback, useEffect, useMemo, useRef, useState } from 'react';
 import axios from 'axios';
 import { useNavigate, useParams } from 'react-router-dom';
 import { ChevronDown, ChevronUp, MapPin } from 'lucide-react';
@@ -7,10 +7,12 @@ import { Footer } from '../components/layout/Footer';
 import { Button } from '../components/ui/Button';
 import { MapContainer, TileLayer, Polygon, Circle, useMap, useMapEvents } from 'react-leaflet';
 import 'leaflet/dist/leaflet.css';
+import { subscribeProgress } from '../utils/progressStream';
 
 const MIN_SCALE = 5;
 const MAX_SCALE = 50;
 const MAX_ANNOTATIONS = 5;
+const LEASE_SIZE = 5;
 
 const isPointInPoly = (point, vs) => {
   const x = point[0], y = point[1];
@@ -72,6 +74,7 @@ const TaskWorkspace = () => {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
   const [detailsOpen, setDetailsOpen] = useState(true);
+  const taskQueue = useRef([]);
 
   const polygon = useMemo(() => {
     const coords = task?.geometry?.coordinates?.[0];
@@ -116,17 +119,43 @@ const TaskWorkspace = () => {
 
   const fetchNextTask = useCallback(async () => {
     setError('');
+    // Lease a batch of tasks in one round trip and work through it locally
+    if (!taskQueue.current.length) {
+      const token = localStorage.getItem('token');
+      const config = { headers: { Authorization: `Bearer ${token}` } };
+      try {
+        const res = await axios.post(
+          `http://localhost:8000/projects/${projectId}/tasks/lease?n=${LEASE_SIZE}`,
+          null,
+          config
+        );
+        taskQueue.current = res.data.tasks;
+      } catch (err) {
+        setTask(null);
+        setError(err?.response?.data?.detail || 'No available tasks.');
+        return;
+      }
+    }
+    const next = taskQueue.current.shift();
+    if (!next) {
+      setTask(null);
+      setError('No available tasks.');
+      return;
+    }
+    setTask(next);
+    setAnnotations([]);
+  }, [projectId]);
+
+  const handleLeave = async () => {
     const token = localStorage.getItem('token');
     const config = { headers: { Authorization: `Bearer ${token}` } };
     try {
-      const res = await axios.get(`http://localhost:8000/projects/${projectId}/tasks/next`, config);
-      setTask(res.data);
-      setAnnotations([]);
+      await axios.delete(`http://localhost:8000/projects/${projectId}/tasks/lease`, config);
     } catch (err) {
-      setTask(null);
-      setError(err?.response?.data?.detail || 'No available tasks.');
+      // Leases expire on their own
     }
-  }, [projectId]);
+    navigate('/dashboard');
+  };
 
   useEffect(() => {
     fetchProject();
@@ -134,6 +163,15 @@ const TaskWorkspace = () => {
     fetchNextTask();
   }, [fetchProject, fetchProgress, fetchNextTask]);
 
+  // Project counters are pushed by the server; user_completed is tracked locally
+  useEffect(() => subscribeProgress(projectId, (event) => {
+    if (event.progress) {
+      setProgress(prev => prev && { ...prev, ...event.progress });
+    } else if (event.resync) {
+      fetchProgress();
+    }
+  }), [projectId, fetchProgress]);
+
   const handleCreateAnnotation = (latlng) => {
     if (!polygon) return;
     const point = [latlng.lat, latlng.lng];
@@ -156,23 +194,18 @@ const TaskWorkspace = () => {
       const token = localStorage.getItem('token');
       const config = { headers: { Authorization: `Bearer ${token}` } };
       
-      // If no annotations, submit a single point with magnitude 0 to signal "no point found"
-      const submissionData = annotations.length > 0 
-        ? annotations.map(a => ({
-            geom: `POINT(${a.lng} ${a.lat})`,
-            label_type: `circle:${a.scale}`
-          }))
-        : [{
-            geom: `POINT(${polygon[0][1]} ${polygon[0][0]})`, // Use first point of task boundary
-            label_type: `circle:0`
-          }];
+      // An empty list signals "no point found"; the server records it inside the task
+      const submissionData = annotations.map(a => ({
+        geom: `POINT(${a.lng} ${a.lat})`,
+        label_type: `circle:${a.scale}`
+      }));
       
       await axios.post('http://localhost:8000/annotations/batch', {
         project_id: parseInt(projectId, 10),
         subdivision_id: task.id,
         annotations: submissionData
       }, config);
-      await fetchProgress();
+      setProgress(prev => prev && { ...prev, user_completed: prev.user_completed + 1 });
       await fetchNextTask();
     } catch (err) {
       setError(err?.response?.data?.detail || 'Failed to submit annotation.');
@@ -198,7 +231,7 @@ const TaskWorkspace = () => {
             <h1 className="text-2xl font-semibold text-slate-900">Task Workspace</h1>
             <p className="text-sm text-slate-500">Complete tasks or leave anytime.</p>
           </div>
-          <Button variant="outline" onClick={() => navigate('/dashboard')}>Leave Project</Button>
+          <Button variant="outline" onClick={handleLeave}>Leave Project</Button>
         </div>
         <div className="flex flex-col gap-6 lg:flex-row">
           <div className="flex-1 bg-white rounded-xl border border-slate-200 overflow-hidden shadow-sm">
@@ -10,6 +10,9 @@ import { Footer } from '../components/layout/Footer';
 import { Button } from '../components/ui/Button';
 import ProjectCard from '../components/ProjectCard'; 
 
+// Thumbnails are ~100px, so boundaries simplified for zoom 13 (about 10 m) are plenty
+const THUMBNAIL_ZOOM = 13;
+
 const UserDashboard = () => {
   const [myProjects, setMyProjects] = useState([]);
   const [allProjects, setAllProjects] = useState([]);
@@ -26,10 +29,20 @@ const UserDashboard = () => {
       try {
         const config = { headers: { Authorization: `Bearer ${token}` } };
         
-        const myProjRes = await axios.get('http://localhost:8000/users/me/projects', config);
+        // Card thumbnails only need boundaries simplified to a coarse zoom
+        const myProjRes = await axios.get('http://localhost:8000/users/me/projects', {
+          ...config,
+          params: {
+            fields: 'id,name,description,nasa_layer_id,created_at,is_active,geometry,user_contribution_count',
+            zoom: THUMBNAIL_ZOOM,
+          },
+        });
         setMyProjects(myProjRes.data || []);
 
-        const allProjRes = await axios.get('http://localhost:8000/projects/', config);
+        const allProjRes = await axios.get('http://localhost:8000/projects/', {
+          ...config,
+          params: { fields: 'id,name,description,nasa_layer_id,created_at,is_active,geometry', zoom: THUMBNAIL_ZOOM },
+        });
         setAllProjects(allProjRes.data || []);
 
       } catch (error) {
@@ -0,0 +1,83 @@
+// Decoder for the backend's compact binary map format (see backend/geobin.py)
+
+export const GEOBIN_MEDIA_TYPE = 'application/vnd.ecomap.geobin';
+
+const INT32 = 1;
+const INT64 = 2;
+const FLOAT64 = 3;
+const UTF8 = 4;
+const TIMESTAMP_MS = 5;
+
+const align8 = (offset) => offset + ((8 - (offset % 8)) % 8);
+
+// Returns { geometryType, count, coords: Float64Array [x0, y0, x1, y1, ...], offsets: [Int32Array], columns: {} }
+export const decodeGeobin = (buffer) => {
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+  if (magic !== 'EMGB') throw new Error('Not a geobin response');
+
+  const geometryType = view.getUint8(5);
+  const columnCount = view.getUint16(6, true);
+  const count = view.getUint32(8, true);
+  const coordCount = view.getUint32(12, true);
+  const levelCount = view.getUint32(16, true);
+  const [x0, y0, sx, sy] = [0, 1, 2, 3].map((i) => view.getFloat64(20 + i * 8, true));
+
+  let offset = 52;
+  const levelLengths = [];
+  for (let i = 0; i < levelCount; i += 1) {
+    levelLengths.push(view.getUint32(offset, true));
+    offset += 4;
+  }
+
+  const decoder = new TextDecoder();
+  const columnSpecs = [];
+  for (let i = 0; i < columnCount; i += 1) {
+    const dtype = view.getUint8(offset);
+    const nameLength = view.getUint8(offset + 1);
+    const name = decoder.decode(new Uint8Array(buffer, offset + 2, nameLength));
+    columnSpecs.push({ name, dtype });
+    offset += 2 + nameLength;
+  }
+
+  // Quantized coordinates back to degrees
+  offset = align8(offset);
+  const quantized = new Uint32Array(buffer, offset, coordCount * 2);
+  const coords = new Float64Array(coordCount * 2);
+  for (let i = 0; i < coordCount; i += 1) {
+    coords[i * 2] = x0 + quantized[i * 2] * sx;
+    coords[i * 2 + 1] = y0 + quantized[i * 2 + 1] * sy;
+  }
+  offset += coordCount * 8;
+
+  const offsets = levelLengths.map((length) => {
+    offset = align8(offset);
+    const level = new Int32Array(buffer, offset, length);
+    offset += length * 4;
+    return level;
+  });
+
+  const columns = {};
+  columnSpecs.forEach(({ name, dtype }) => {
+    offset = align8(offset);
+    if (dtype === UTF8) {
+      const stringOffsets = new Uint32Array(buffer, offset, count + 1);
+      const bytes = new Uint8Array(buffer, offset + (count + 1) * 4, stringOffsets[count]);
+      columns[name] = Array.from({ length: count }, (_, i) => (
+        decoder.decode(bytes.subarray(stringOffsets[i], stringOffsets[i + 1]))
+      ));
+      offset += (count + 1) * 4 + stringOffsets[count];
+    } else if (dtype === INT32) {
+      columns[name] = new Int32Array(buffer, offset, count);
+      offset += count * 4;
+    } else if (dtype === FLOAT64) {
+      columns[name] = new Float64Array(buffer, offset, count);
+      offset += count * 8;
+    } else if (dtype === INT64 || dtype === TIMESTAMP_MS) {
+      columns[name] = new BigInt64Array(buffer, offset, count);
+      offset += count * 8;
+    }
+  });
+
+  return { geometryType, count, coords, offsets, columns };
+};
@@ -0,0 +1,16 @@
+import axios from 'axios';
+
+// Polling for background admin jobs (see backend/jobs.py)
+
+const FINISHED = ['succeeded', 'failed', 'cancelled'];
+const POLL_MS = 1000;
+
+// Resolves with the finished job, calling onProgress with each unfinished one.
+export const waitForJob = async (jobId, config, onProgress) => {
+  for (;;) {
+    const { data: job } = await axios.get(`http://localhost:8000/jobs/${jobId}`, config);
+    if (FINISHED.includes(job.status)) return job;
+    if (onProgress) onProgress(job);
+    await new Promise(resolve => setTimeout(resolve, POLL_MS));
+  }
+};
@@ -0,0 +1,59 @@
+// Live project progress over Server-Sent Events (see backend/live.py)
+import axios from 'axios';
+
+// Delay before reopening a dropped stream
+const RECONNECT_MS = 3000;
+
+// EventSource cannot send headers, so the stream is opened with a short-lived
+// token scoped to the project instead of putting the access token in the URL.
+const fetchStreamToken = async (projectId) => {
+  const token = localStorage.getItem('token');
+  const { data } = await axios.post(
+    `http://localhost:8000/projects/${projectId}/events/token`,
+    null,
+    { headers: { Authorization: `Bearer ${token}` } }
+  );
+  return data.token;
+};
+
+// Calls onEvent with each { project_id, version, subdivisions: [[id, count]], progress, resync } event.
+// A dropped stream is reopened with a fresh token; the first event after a (re)connect is a snapshot.
+// Returns a function that closes the stream.
+export const subscribeProgress = (projectId, onEvent) => {
+  let source = null;
+  let timer = null;
+  let closed = false;
+
+  const reconnect = () => {
+    if (!closed) timer = setTimeout(connect, RECONNECT_MS);
+  };
+
+  const connect = async () => {
+    let token;
+    try {
+      token = await fetchStreamToken(projectId);
+    } catch (err) {
+      // Signed out or no such project: retrying will not help
+      if ([401, 403, 404].includes(err.response?.status)) return;
+      reconnect();
+      return;
+    }
+    if (closed) return;
+    source = new EventSource(
+      `http://localhost:8000/projects/${projectId}/events?token=${encodeURIComponent(token)}`
+    );
+    source.addEventListener('progress', (e) => onEvent(JSON.parse(e.data)));
+    // The token has expired by the time EventSource would retry, so reconnect with a new one
+    source.onerror = () => {
+      source.close();
+      reconnect();
+    };
+  };
+
+  connect();
+  return () => {
+    closed = true;
+    clearTimeout(timer);
+    if (source) source.close();
+  };
+};